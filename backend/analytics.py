@@ -0,0 +1,247 @@
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from jobs import PeriodicJob, acquire_lease, release_lease
+
+
+logger = logging.getLogger(__name__)
+
+SOURCES = ("contact", "status")
+
+# Buckets kept in the precomputed series document of every unit
+SERIES_LENGTH = {"hour": 168, "day": 90, "week": 52, "month": 24}
+
+# Rows changed within this margin before the last watermark are rescanned, covering clock skew
+# between workers and writes that were in flight while the previous refresh ran
+WATERMARK_OVERLAP = timedelta(minutes=5)
+
+# Affected buckets are recomputed with one $or range query per chunk
+BUCKETS_PER_QUERY = 200
+
+
+def _truncate(field: str, unit: str, tz: str) -> Dict[str, Any]:
+    return {"$dateTrunc": {"date": field, "unit": unit, "timezone": tz, "startOfWeek": "monday"}}
+
+
+def contact_rollup_stages(unit: str, tz: str, refreshed_at: datetime) -> List[Dict[str, Any]]:
+    """Group contact messages into one rollup document per bucket of created_at"""
+    # First response time: responded_at, or status_changed_at for rows answered before it existed
+    responded_at = {"$ifNull": ["$responded_at", {
+        "$cond": [{"$eq": ["$status", "responded"]}, "$status_changed_at", None]
+    }]}
+    response_seconds = {"$cond": [
+        {"$eq": [{"$type": responded_at}, "date"]},
+        {"$divide": [{"$subtract": [responded_at, "$created_at"]}, 1000]},
+        None,
+    ]}
+    count_status = lambda status: {"$sum": {"$cond": [{"$eq": ["$status", status]}, 1, 0]}}  # noqa: E731
+    return [
+        {"$group": {
+            "_id": _truncate("$created_at", unit, tz),
+            "total": {"$sum": 1},
+            "new": count_status("new"),
+            "read": count_status("read"),
+            "responded": count_status("responded"),
+            "response_count": {"$sum": {"$cond": [{"$eq": [{"$type": responded_at}, "date"]}, 1, 0]}},
+            "response_avg": {"$avg": response_seconds},
+            "response_min": {"$min": response_seconds},
+            "response_max": {"$max": response_seconds},
+        }},
+        {"$project": {
+            "_id": 0,
+            "source": "contact",
+            "unit": unit,
+            "bucket": "$_id",
+            "total": 1,
+            "by_status": {"new": "$new", "read": "$read", "responded": "$responded"},
+            "response_time": {
+                "count": "$response_count",
+                "avg_seconds": "$response_avg",
+                "min_seconds": "$response_min",
+                "max_seconds": "$response_max",
+            },
+            "refreshed_at": {"$literal": refreshed_at},
+        }},
+    ]
+
+
+def status_rollup_stages(unit: str, tz: str, refreshed_at: datetime) -> List[Dict[str, Any]]:
+    """Group status checks into one rollup document per bucket of timestamp"""
+    return [
+        {"$group": {
+            "_id": _truncate("$timestamp", unit, tz),
+            "total": {"$sum": 1},
+            "clients": {"$addToSet": "$client_name"},
+        }},
+        {"$project": {
+            "_id": 0,
+            "source": "status",
+            "unit": unit,
+            "bucket": "$_id",
+            "total": 1,
+            "distinct_clients": {"$size": "$clients"},
+            "refreshed_at": {"$literal": refreshed_at},
+        }},
+    ]
+
+
+class AnalyticsRollups(PeriodicJob):
+    """Time-bucketed counters pre-aggregated into MongoDB and refreshed incrementally.
+
+    Every (source, unit) bucket is stored as its own document in the rollup collection, and the
+    latest SERIES_LENGTH buckets are also copied into a single series document, so a dashboard
+    read is one find_one. A refresh only recomputes the buckets touched since its watermark.
+    """
+
+    # (collection, time field, stages builder) per source
+    SOURCE_SPECS = {
+        "contact": ("contact_messages", "created_at", contact_rollup_stages),
+        "status": ("status_checks", "timestamp", status_rollup_stages),
+    }
+
+    name = "Analytics refresh"
+
+    def __init__(self, db, read_db=None, tz: str = "UTC", interval: float = 60.0, lease_seconds: float = 300.0,
+                 contact_archive: Optional[str] = None, freeze_after: Optional[timedelta] = None):
+        super().__init__(interval)
+        self.db = db
+        self.rollups = db.analytics_rollups
+        self.series = db.analytics_series
+        # Dashboard reads may go to secondaries, the refresh itself always runs on the primary
+        self.read_db = read_db if read_db is not None else db
+        self.tz = tz
+        self.lease_seconds = lease_seconds
+        # Archived contact messages still count: a bucket is rebuilt from the hot collection plus
+        # this archive collection. Without one (archives written to files), buckets old enough to
+        # hold archived rows are frozen instead, starting freeze_after before the refresh.
+        self.contact_archive = contact_archive
+        self.freeze_after = freeze_after
+
+    @staticmethod
+    def series_id(source: str, unit: str) -> str:
+        return f"{source}:{unit}"
+
+    def _changed_filter(self, source: str, since: datetime) -> Dict[str, Any]:
+        if source == "contact":
+            # New messages, and older messages whose status moved since the last refresh
+            return {"$or": [{"created_at": {"$gte": since}}, {"status_changed_at": {"$gte": since}}]}
+        # Status checks are never modified after insert
+        return {"timestamp": {"$gte": since}}
+
+    def _source_stages(self, source: str, match: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Rows of a source matching the filter, archived contact messages included"""
+        if source != "contact" or self.contact_archive is None:
+            return [{"$match": match}]
+        return [
+            {"$match": match},
+            {"$unionWith": {"coll": self.contact_archive, "pipeline": [{"$match": match}]}},
+            # A row is in both collections while the retention job moves it, the hot copy wins
+            {"$group": {"_id": "$id", "row": {"$first": "$$ROOT"}}},
+            {"$replaceWith": "$row"},
+        ]
+
+    async def _affected_buckets(self, collection, field: str, unit: str, stages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        pipeline = stages + [
+            {"$group": {"_id": _truncate(f"${field}", unit, self.tz)}},
+            {"$project": {"start": "$_id", "end": {
+                "$dateAdd": {"startDate": "$_id", "unit": unit, "amount": 1, "timezone": self.tz}
+            }}},
+        ]
+        return [row async for row in collection.aggregate(pipeline)]
+
+    async def refresh_series(self, source: str, unit: str, full: bool = False) -> Optional[Dict[str, Any]]:
+        """Recompute changed buckets of one series, returns None when another worker is refreshing it"""
+        key = self.series_id(source, unit)
+        started = datetime.now(timezone.utc)
+        # Only one worker refreshes a series at a time
+        state = await acquire_lease(self.series, key, started, self.lease_seconds)
+        if state is None:
+            return None
+
+        collection_name, field, stages = self.SOURCE_SPECS[source]
+        collection = self.db[collection_name]
+        # Legacy rows with ISO string timestamps are skipped until they are migrated
+        match: Dict[str, Any] = {field: {"$type": "date"}}
+        watermark = None if full else state.get("watermark")
+        if watermark is not None:
+            match = {"$and": [match, self._changed_filter(source, watermark - WATERMARK_OVERLAP)]}
+
+        recomputed = 0
+        try:
+            # Archived rows never change, only a full rebuild has to look for their buckets
+            scan = self._source_stages(source, match) if watermark is None else [{"$match": match}]
+            buckets = await self._affected_buckets(collection, field, unit, scan)
+            if self.freeze_after is not None:
+                frozen_before = started - self.freeze_after
+                buckets = [b for b in buckets if b["start"] >= frozen_before]
+            for offset in range(0, len(buckets), BUCKETS_PER_QUERY):
+                chunk = buckets[offset:offset + BUCKETS_PER_QUERY]
+                ranges = [{field: {"$gte": b["start"], "$lt": b["end"]}} for b in chunk]
+                pipeline = self._source_stages(source, {"$or": ranges}) + stages(unit, self.tz, started) + [
+                    {"$merge": {
+                        "into": self.rollups.name,
+                        "on": ["source", "unit", "bucket"],
+                        "whenMatched": "replace",
+                        "whenNotMatched": "insert",
+                    }},
+                ]
+                async for _ in collection.aggregate(pipeline):
+                    pass
+                recomputed += len(chunk)
+
+            latest = await self.rollups.find(
+                {"source": source, "unit": unit}, {"_id": 0, "source": 0, "unit": 0}
+            ).sort("bucket", -1).limit(SERIES_LENGTH[unit]).to_list(SERIES_LENGTH[unit])
+            latest.reverse()
+            await self.series.update_one({"_id": key}, {"$set": {
+                "source": source,
+                "unit": unit,
+                "timezone": self.tz,
+                "buckets": latest,
+                "total": sum(b["total"] for b in latest),
+                "refreshed_at": started,
+                "watermark": started,
+                "lease_until": None,
+            }})
+        except Exception:
+            await release_lease(self.series, key)
+            raise
+
+        return {"series": key, "recomputed_buckets": recomputed, "full": watermark is None}
+
+    async def refresh(self, full: bool = False) -> List[Dict[str, Any]]:
+        results = []
+        for source in SOURCES:
+            for unit in SERIES_LENGTH:
+                result = await self.refresh_series(source, unit, full=full)
+                if result is not None:
+                    results.append(result)
+        return results
+
+    async def get_series(self, source: str, unit: str) -> Optional[Dict[str, Any]]:
+        """The precomputed latest buckets of a series, a single document read"""
+        return await self.read_db.analytics_series.find_one(
+            {"_id": self.series_id(source, unit)}, {"_id": 0, "watermark": 0, "lease_until": 0}
+        )
+
+    async def get_range(self, source: str, unit: str, since: Optional[datetime], until: Optional[datetime],
+                        limit: int = 1000) -> List[Dict[str, Any]]:
+        """Rollup buckets in [since, until), served by the source_unit_bucket index"""
+        query: Dict[str, Any] = {"source": source, "unit": unit}
+        bucket: Dict[str, Any] = {}
+        if since is not None:
+            bucket["$gte"] = since
+        if until is not None:
+            bucket["$lt"] = until
+        if bucket:
+            query["bucket"] = bucket
+        return await self.read_db.analytics_rollups.find(query, {"_id": 0, "source": 0, "unit": 0}).sort(
+            "bucket", 1
+        ).limit(limit).to_list(limit)
+
+    async def tick(self):
+        results = await self.refresh()
+        changed = sum(r["recomputed_buckets"] for r in results)
+        if changed:
+            logger.info(f"Analytics rollups refreshed, {changed} buckets recomputed")
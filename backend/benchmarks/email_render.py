@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark of email rendering cost per message.
+
+Compares the precompiled, cached templates against compiling the same template source on
+every render, for single notifications and for digests of increasing size.
+
+    cd backend
+    python benchmarks/email_render.py --iterations 2000
+"""
+import argparse
+import sys
+import timeit
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from email_templates import EmailTemplates  # noqa: E402
+
+
+class Contact:
+    def __init__(self, n: int):
+        self.id = str(uuid.uuid4())
+        self.name = f"Ján Novák {n}"
+        self.email = f"jan.novak{n}@example.com"
+        self.phone = "+421901234567" if n % 2 else None
+        self.message = "Dobrý deň, potrebujem informácie o preprave tovaru <z Bratislavy> & Košíc.\n" * 3
+        self.created_at = datetime.now(timezone.utc)
+
+
+def per_call_us(fn, iterations: int) -> float:
+    # Best of three runs, reported in microseconds per call
+    return min(timeit.repeat(fn, number=iterations, repeat=3)) / iterations * 1_000_000
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark email template rendering")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--locale", default="sk")
+    args = parser.parse_args()
+
+    templates = EmailTemplates(BACKEND_DIR / "templates" / "email")
+    compile_start = timeit.default_timer()
+    count = templates.load()
+    print(f"compiled {count} templates in {(timeit.default_timer() - compile_start) * 1000:.1f} ms")
+
+    contact = Contact(1)
+    single = {"contact": contact}
+    cached = per_call_us(lambda: templates.render("contact_notification", single, args.locale), args.iterations)
+
+    # Baseline: a fresh environment compiles the template source on every message
+    def uncached():
+        fresh = EmailTemplates(BACKEND_DIR / "templates" / "email")
+        fresh.render("contact_notification", single, args.locale)
+
+    uncompiled = per_call_us(uncached, max(1, args.iterations // 20))
+    print(f"{'case':<28}{'us/render':>12}{'us/message':>12}{'html bytes':>12}")
+    size = len(templates.render("contact_notification", single, args.locale).html.encode())
+    print(f"{'notification (cached)':<28}{cached:>12.1f}{cached:>12.1f}{size:>12}")
+    print(f"{'notification (compiled)':<28}{uncompiled:>12.1f}{uncompiled:>12.1f}{size:>12}")
+
+    for batch in (10, 50):
+        contacts = [Contact(n) for n in range(batch)]
+        context = {"contacts": contacts, "total": batch}
+        cost = per_call_us(lambda: templates.render("contact_digest", context, args.locale),
+                           max(1, args.iterations // batch))
+        size = len(templates.render("contact_digest", context, args.locale).html.encode())
+        print(f"{f'digest of {batch} (cached)':<28}{cost:>12.1f}{cost / batch:>12.1f}{size:>12}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
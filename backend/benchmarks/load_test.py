@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Load test for the contact/status API.
+
+By default the FastAPI app is driven in-process through httpx's ASGI transport, backed by
+mongomock (no MongoDB needed) and the fake email sender. Pass --url to hit a running uvicorn
+instead, or --mongo real to use MONGO_URL/DB_NAME from the environment. In-process runs
+disable rate limiting unless RATE_LIMIT_ENABLED is set; a server under --url needs the same.
+
+    cd backend
+    python benchmarks/load_test.py --duration 10 --rate 200
+    python benchmarks/load_test.py --rate 0 --concurrency 64          # closed loop, max throughput
+    python benchmarks/load_test.py --compare benchmarks/results/baseline.json --fail-on-regression
+    python benchmarks/load_test.py --url http://localhost:8001 --duration 30
+
+Results are written as JSON to benchmarks/results/ so runs can be compared later.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import httpx
+
+
+BENCH_DIR = Path(__file__).parent
+BACKEND_DIR = BENCH_DIR.parent
+RESULTS_DIR = BENCH_DIR / "results"
+
+DEFAULT_MIX = "post_contact=1,get_contact=4,post_status=1,get_status=4"
+
+
+def contact_payload(n: int) -> dict:
+    return {
+        "name": f"Ján Novák {n}",
+        "email": f"bench.{n}.{random.getrandbits(32)}@example.com",
+        "phone": "+421901234567",
+        "message": f"Dobrý deň, potrebujem informácie o preprave tovaru, požiadavka {n}.",
+    }
+
+
+def make_scenarios() -> Dict[str, Callable]:
+    counter = {"n": 0}
+
+    def next_n():
+        counter["n"] += 1
+        return counter["n"]
+
+    return {
+        "post_contact": lambda client: client.post("/api/contact", json=contact_payload(next_n())),
+        "get_contact": lambda client: client.get("/api/contact", params={"limit": 100}),
+        "post_status": lambda client: client.post("/api/status", json={"client_name": f"bench-{next_n()}"}),
+        "get_status": lambda client: client.get("/api/status"),
+    }
+
+
+def parse_mix(mix: str) -> Dict[str, int]:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        weights[name.strip()] = int(weight or 1)
+    return weights
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def rss_mb() -> float:
+    """Current resident set size of this process"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except OSError:
+        return peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes on Linux
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+async def seed(client: httpx.AsyncClient, count: int):
+    """Pre-populate contact messages through the bulk endpoint"""
+    for start in range(0, count, 1000):
+        batch = [contact_payload(-(start + i)) for i in range(min(1000, count - start))]
+        response = await client.post("/api/contact/bulk", json={"messages": batch})
+        response.raise_for_status()
+
+
+async def run_load(client, scenarios, weights, rate: float, duration: float, concurrency: int, seed_value: int):
+    rng = random.Random(seed_value)
+    names = list(weights)
+    weight_list = [weights[name] for name in names]
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    statuses: Dict[str, Counter] = defaultdict(Counter)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(name: str):
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                response = await scenarios[name](client)
+                status = str(response.status_code)
+            except Exception as e:
+                status = type(e).__name__
+            latencies[name].append(time.perf_counter() - start)
+            statuses[name][status] += 1
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    if rate > 0:
+        # Open loop: requests are issued on a fixed schedule regardless of response times
+        tasks = []
+        issued = 0
+        while loop.time() - started < duration:
+            target = started + issued / rate
+            delay = target - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            name = rng.choices(names, weights=weight_list)[0]
+            tasks.append(asyncio.create_task(one(name)))
+            issued += 1
+        await asyncio.gather(*tasks)
+    else:
+        # Closed loop: `concurrency` clients send back-to-back requests
+        async def client_loop():
+            while loop.time() - started < duration:
+                await one(rng.choices(names, weights=weight_list)[0])
+
+        await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+    elapsed = loop.time() - started
+    return latencies, statuses, elapsed
+
+
+def summarize(latencies, statuses, elapsed: float) -> Dict[str, dict]:
+    summary = {}
+    total = 0
+    for name in sorted(latencies):
+        values = sorted(latencies[name])
+        total += len(values)
+        errors = sum(count for status, count in statuses[name].items() if not status.startswith(("2", "3")))
+        summary[name] = {
+            "requests": len(values),
+            "errors": errors,
+            "statuses": dict(statuses[name]),
+            "throughput_rps": round(len(values) / elapsed, 2),
+            "p50_ms": round(percentile(values, 50) * 1000, 3),
+            "p90_ms": round(percentile(values, 90) * 1000, 3),
+            "p99_ms": round(percentile(values, 99) * 1000, 3),
+            "max_ms": round(values[-1] * 1000, 3) if values else 0.0,
+            "mean_ms": round(sum(values) / len(values) * 1000, 3) if values else 0.0,
+        }
+    summary["total"] = {"requests": total, "throughput_rps": round(total / elapsed, 2)}
+    return summary
+
+
+def compare(current: Dict[str, dict], baseline: Dict[str, dict], threshold: float) -> List[str]:
+    """Return human readable regressions of p99 latency and throughput beyond `threshold`"""
+    regressions = []
+    for name, stats in current.items():
+        base = baseline.get(name)
+        if not base or name == "total":
+            continue
+        if base["p99_ms"] and stats["p99_ms"] > base["p99_ms"] * (1 + threshold):
+            regressions.append(f"{name}: p99 {base['p99_ms']}ms -> {stats['p99_ms']}ms")
+        if base["throughput_rps"] and stats["throughput_rps"] < base["throughput_rps"] * (1 - threshold):
+            regressions.append(f"{name}: throughput {base['throughput_rps']} -> {stats['throughput_rps']} req/s")
+    return regressions
+
+
+def print_report(summary: Dict[str, dict], memory: Dict[str, float]):
+    print(f"{'scenario':<14}{'reqs':>8}{'err':>6}{'rps':>10}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, stats in summary.items():
+        if name == "total":
+            continue
+        print(f"{name:<14}{stats['requests']:>8}{stats['errors']:>6}{stats['throughput_rps']:>10}"
+              f"{stats['p50_ms']:>10}{stats['p90_ms']:>10}{stats['p99_ms']:>10}{stats['max_ms']:>10}")
+    print(f"total: {summary['total']['requests']} requests, {summary['total']['throughput_rps']} req/s")
+    print(f"memory: rss {memory['rss_start_mb']:.1f} -> {memory['rss_end_mb']:.1f} MB, peak {memory['peak_rss_mb']:.1f} MB")
+
+
+def prepare_in_process(mongo: str):
+    """Import the app with the fake email sender and, optionally, mongomock in place of MongoDB"""
+    os.environ["EMAIL_SENDER"] = "fake"
+    # All benchmark traffic comes from one client address, per-IP limits would reject most of it
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+    sys.path.insert(0, str(BACKEND_DIR))
+    if mongo == "mongomock":
+        import functools
+
+        import motor.motor_asyncio
+        from mongomock_motor import AsyncMongoMockClient
+
+        os.environ.setdefault("MONGO_URL", "mongodb://mongomock")
+        os.environ.setdefault("DB_NAME", "benchmark")
+        # mongomock has no $dateTrunc, $merge or collection storage options, these jobs would only log errors
+        os.environ.setdefault("ANALYTICS_REFRESH_INTERVAL", "0")
+        os.environ.setdefault("RETENTION_INTERVAL", "0")
+        # mongomock rejects the comment option of most commands
+        os.environ.setdefault("MONGO_REQUEST_COMMENTS", "false")
+        motor.motor_asyncio.AsyncIOMotorClient = functools.partial(AsyncMongoMockClient, tz_aware=True)
+
+    from server import app
+    return app
+
+
+async def main_async(args) -> int:
+    weights = parse_mix(args.mix)
+    scenarios = make_scenarios()
+    unknown = set(weights) - set(scenarios)
+    if unknown:
+        print(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+        return 2
+
+    memory = {"rss_start_mb": rss_mb()}
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url.rstrip("/"), limits=limits, timeout=30)
+        lifespan = None
+    else:
+        app = prepare_in_process(args.mongo)
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=30)
+        lifespan = app.router.lifespan_context(app)
+
+    try:
+        if lifespan is not None:
+            await lifespan.__aenter__()
+        if args.seed_messages:
+            await seed(client, args.seed_messages)
+        if args.warmup:
+            await run_load(client, scenarios, weights, args.rate, args.warmup, args.concurrency, args.seed)
+        latencies, statuses, elapsed = await run_load(
+            client, scenarios, weights, args.rate, args.duration, args.concurrency, args.seed
+        )
+    finally:
+        await client.aclose()
+        if lifespan is not None:
+            await lifespan.__aexit__(None, None, None)
+
+    memory["rss_end_mb"] = rss_mb()
+    memory["peak_rss_mb"] = peak_rss_mb()
+    summary = summarize(latencies, statuses, elapsed)
+    print_report(summary, memory)
+
+    result = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "config": {
+            "target": args.url or f"in-process ({args.mongo})",
+            "rate": args.rate,
+            "duration": args.duration,
+            "concurrency": args.concurrency,
+            "mix": weights,
+            "seed_messages": args.seed_messages,
+        },
+        "environment": {"python": platform.python_version(), "platform": platform.platform()},
+        "memory": memory,
+        "results": summary,
+    }
+    output = Path(args.output) if args.output else RESULTS_DIR / f"load_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(result, indent=2, ensure_ascii=False))
+    print(f"results saved to {output}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())["results"]
+        regressions = compare(summary, baseline, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if not regressions:
+            print(f"no regressions against {args.compare} (threshold {args.threshold:.0%})")
+        if regressions and args.fail_on_regression:
+            return 1
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Load test the FENJI Slovakia backend API")
+    parser.add_argument("--url", help="base URL of a running server, default is in-process")
+    parser.add_argument("--mongo", choices=["mongomock", "real"], default="mongomock",
+                        help="database for in-process runs")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of measured load")
+    parser.add_argument("--warmup", type=float, default=1.0, help="seconds of unmeasured load first")
+    parser.add_argument("--rate", type=float, default=100.0, help="requests/s, 0 for closed loop")
+    parser.add_argument("--concurrency", type=int, default=32, help="max requests in flight")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"scenario weights (default {DEFAULT_MIX})")
+    parser.add_argument("--seed-messages", type=int, default=500, help="contact messages inserted before the run")
+    parser.add_argument("--seed", type=int, default=42, help="random seed for the scenario mix")
+    parser.add_argument("--output", help="result file, default benchmarks/results/load_<timestamp>.json")
+    parser.add_argument("--compare", help="previous result file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed relative regression")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    return asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
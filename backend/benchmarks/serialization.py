@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark of list response serialization and compression per page.
+
+Encodes pages of contact messages shaped like MongoDB rows three ways: the previous
+response_model path (validate, convert to JSON-able Python, json.dumps), the cached
+TypeAdapter with Pydantic's JSON encoder, and the fast orjson path for trusted rows.
+Then reports the bytes and CPU of gzip and brotli for the same pages.
+
+    cd backend
+    python benchmarks/serialization.py --pages 100,1000
+"""
+import argparse
+import json
+import sys
+import timeit
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import List, Optional
+
+BACKEND_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from pydantic import BaseModel, ConfigDict  # noqa: E402
+
+from cache import ResponseCompressor, brotli  # noqa: E402
+from serialization import RowSerializer, orjson  # noqa: E402
+
+
+class ContactMessage(BaseModel):
+    # Mirrors server.ContactMessage without importing the app and its settings
+    model_config = ConfigDict(extra="ignore")
+
+    id: str
+    name: str
+    email: str
+    phone: Optional[str] = None
+    message: str
+    created_at: datetime
+    status: str = "new"
+    status_changed_at: Optional[datetime] = None
+    responded_at: Optional[datetime] = None
+    version: int = 0
+
+
+def make_rows(count: int) -> List[dict]:
+    now = datetime.now(timezone.utc).replace(microsecond=123000)
+    return [{
+        "id": str(uuid.uuid4()),
+        "name": f"Ján Novák {n}",
+        "email": f"jan.novak{n}@example.com",
+        "phone": "+421901234567" if n % 2 else None,
+        "message": "Dobrý deň, potrebujem informácie o preprave tovaru z Bratislavy do Košíc. " * 3,
+        "created_at": now - timedelta(minutes=n),
+        "status": ("new", "read", "responded")[n % 3],
+        "status_changed_at": now if n % 3 else None,
+        "version": n % 3,
+    } for n in range(count)]
+
+
+def per_call_ms(fn, number: int) -> float:
+    # Best of three runs, reported in milliseconds per call
+    return min(timeit.repeat(fn, number=number, repeat=3)) / number * 1000
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark list response serialization and compression")
+    parser.add_argument("--pages", default="100,1000", help="comma separated page sizes")
+    parser.add_argument("--number", type=int, default=20, help="calls per timing run")
+    args = parser.parse_args()
+
+    validated = RowSerializer(ContactMessage, "validated")
+    fast = RowSerializer(ContactMessage, "fast")
+    adapter = validated.adapter
+    compressor = ResponseCompressor()
+    if orjson is None:
+        print("orjson is not installed, the fast path falls back to the validated one")
+
+    for size in (int(value) for value in args.pages.split(",")):
+        rows = make_rows(size)
+
+        def response_model():
+            # What FastAPI did for a response_model=List[...] handler returning dicts
+            content = adapter.dump_python(adapter.validate_python(rows), mode="json")
+            return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+        body = fast.dump(rows)
+        assert json.loads(body) == json.loads(validated.dump(rows)) == json.loads(response_model())
+
+        print(f"\npage of {size} rows, {len(body)} bytes")
+        print(f"{'serializer':<28}{'ms/page':>10}{'speedup':>10}")
+        costs = [(name, per_call_ms(fn, args.number)) for name, fn in (
+            ("response_model + json", response_model),
+            ("TypeAdapter.dump_json", lambda: validated.dump(rows)),
+            ("fast (orjson)", lambda: fast.dump(rows)),
+        )]
+        for name, cost in costs:
+            print(f"{name:<28}{cost:>10.2f}{costs[0][1] / cost:>9.1f}x")
+
+        print(f"{'coding':<28}{'ms/page':>10}{'bytes':>10}{'saved':>8}")
+        print(f"{'identity':<28}{0:>10.2f}{len(body):>10}{'0%':>8}")
+        for coding in compressor.codings:
+            compressed = compressor.compress(body, coding)
+            cost = per_call_ms(lambda: compressor.compress(body, coding), args.number)
+            saved = 1 - len(compressed) / len(body)
+            print(f"{coding:<28}{cost:>10.2f}{len(compressed):>10}{saved:>8.0%}")
+    if brotli is None:
+        print("\nbrotli is not installed, only gzip is offered")
+    print("\nCompressed bodies are kept with the cached response, repeat requests within the TTL skip both costs.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
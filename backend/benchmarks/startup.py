@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Cold start benchmark: import time and time to first request of a fresh worker.
+
+Every sample is a new Python process, like a worker started during scale-out. By default
+the child imports the app, enters its lifespan and serves one request in-process (mongomock
+and the fake email sender, as in load_test.py). With --uvicorn it starts a real uvicorn
+worker against MONGO_URL and polls /api/health/ready until the first successful response.
+
+    cd backend
+    python benchmarks/startup.py --runs 10
+    python benchmarks/startup.py --uvicorn --runs 5
+    python -X importtime -c "import server" 2> importtime.log    # per-module breakdown
+
+Results are written as JSON to benchmarks/results/ so runs can be compared later.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List
+
+BENCH_DIR = Path(__file__).parent
+BACKEND_DIR = BENCH_DIR.parent
+RESULTS_DIR = BENCH_DIR / "results"
+
+
+async def child(mongo: str) -> Dict[str, float]:
+    """Runs inside the fresh process, times each startup phase in milliseconds"""
+    sys.path.insert(0, str(BENCH_DIR))
+    # Benchmark tooling is loaded before the clock starts, only the app's own imports are timed.
+    # With mongomock the driver is imported early too, to patch it.
+    import httpx
+    from load_test import prepare_in_process
+
+    if mongo == "mongomock":
+        import mongomock_motor  # noqa: F401
+
+    started = time.perf_counter()
+    app = prepare_in_process(mongo)
+    imported = time.perf_counter()
+
+    lifespan = app.router.lifespan_context(app)
+    await lifespan.__aenter__()
+    ready = time.perf_counter()
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            response = await client.get("/api/status")
+            response.raise_for_status()
+        served = time.perf_counter()
+    finally:
+        await lifespan.__aexit__(None, None, None)
+
+    return {
+        "import_ms": (imported - started) * 1000,
+        "lifespan_ms": (ready - imported) * 1000,
+        "first_request_ms": (served - ready) * 1000,
+        "time_to_first_request_ms": (served - started) * 1000,
+    }
+
+
+def sample_in_process(mongo: str) -> Dict[str, float]:
+    started = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, __file__, "--child", "--mongo", mongo],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+    ).stdout
+    # The process also pays interpreter startup and shutdown, reported as wall time
+    sample = json.loads(output.strip().splitlines()[-1])
+    sample["process_wall_ms"] = (time.perf_counter() - started) * 1000
+    return sample
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def sample_uvicorn(timeout: float) -> Dict[str, float]:
+    import httpx
+
+    port = free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with code {process.returncode}")
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/api/health/ready", timeout=1).status_code == 200:
+                    return {"time_to_first_request_ms": (time.perf_counter() - started) * 1000}
+            except httpx.TransportError:
+                pass
+            time.sleep(0.005)
+        raise RuntimeError(f"no successful response within {timeout:g}s")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def summarize(samples: List[Dict[str, float]]) -> Dict[str, Dict[str, float]]:
+    summary = {}
+    for metric in samples[0]:
+        values = sorted(sample[metric] for sample in samples)
+        summary[metric] = {
+            "min": round(values[0], 1),
+            "median": round(statistics.median(values), 1),
+            "p90": round(values[min(len(values) - 1, int(len(values) * 0.9))], 1),
+            "max": round(values[-1], 1),
+        }
+    return summary
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark cold start of the FENJI Slovakia backend")
+    parser.add_argument("--runs", type=int, default=10, help="fresh processes to sample")
+    parser.add_argument("--mongo", choices=["mongomock", "real"], default="mongomock",
+                        help="database for in-process runs")
+    parser.add_argument("--uvicorn", action="store_true", help="start real uvicorn workers, needs MONGO_URL")
+    parser.add_argument("--timeout", type=float, default=30.0, help="seconds to wait for a uvicorn worker")
+    parser.add_argument("--output", help="result file, default benchmarks/results/startup_<timestamp>.json")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(child(args.mongo))))
+        return 0
+
+    samples = []
+    for run in range(args.runs):
+        samples.append(sample_uvicorn(args.timeout) if args.uvicorn else sample_in_process(args.mongo))
+        print(f"run {run + 1}/{args.runs}: " + ", ".join(f"{k} {v:.1f}" for k, v in samples[-1].items()))
+
+    summary = summarize(samples)
+    print(f"{'phase':<26}{'min ms':>10}{'median ms':>12}{'p90 ms':>10}{'max ms':>10}")
+    for metric, stats in summary.items():
+        print(f"{metric:<26}{stats['min']:>10}{stats['median']:>12}{stats['p90']:>10}{stats['max']:>10}")
+
+    result = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "config": {"target": "uvicorn" if args.uvicorn else f"in-process ({args.mongo})", "runs": args.runs},
+        "environment": {"python": platform.python_version(), "platform": platform.platform()},
+        "results": summary,
+        "samples": samples,
+    }
+    output = Path(args.output) if args.output else RESULTS_DIR / f"startup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(result, indent=2, ensure_ascii=False))
+    print(f"results saved to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
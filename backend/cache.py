@@ -0,0 +1,158 @@
+import gzip
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - gzip only without the optional brotli package
+    brotli = None
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    etag: str
+    headers: Dict[str, str]
+    expires_at: float
+    # Compressed copies of body by content coding, made on first request for each coding
+    encoded: Dict[str, bytes]
+
+
+def etag_for(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+class ResponseCache:
+    """Size-bounded LRU of serialized responses with a TTL and per-namespace invalidation"""
+
+    def __init__(self, max_entries: int = 256, ttl: float = 5.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple, CachedResponse]" = OrderedDict()
+        # Invalidation bumps the namespace generation, stale keys then age out of the LRU
+        self._generations: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0
+
+    def key(self, namespace: str, request: Request) -> Tuple:
+        params = tuple(sorted(request.query_params.multi_items()))
+        return (namespace, self._generations.get(namespace, 0), request.url.path, params)
+
+    def get(self, key: Tuple) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is None or entry.expires_at < time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key: Tuple, body: bytes, headers: Optional[Dict[str, str]] = None) -> CachedResponse:
+        entry = CachedResponse(body, etag_for(body), headers or {}, time.monotonic() + self.ttl, {})
+        if not self.enabled or key[1] != self._generations.get(key[0], 0):
+            # Disabled, or the namespace was invalidated while the response was being built
+            return entry
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return entry
+
+    def invalidate(self, namespace: str):
+        self._generations[namespace] = self._generations.get(namespace, 0) + 1
+        self.invalidations += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+class ResponseCompressor:
+    """Content negotiation and compression of response bodies (brotli when installed, gzip)"""
+
+    def __init__(self, min_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 5):
+        # Below min_size the headers outweigh the savings; min_size <= 0 disables compression
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.codings = (("br",) if brotli is not None else ()) + ("gzip",)
+
+    def negotiate(self, accept_encoding: Optional[str]) -> Optional[str]:
+        """Preferred coding from an Accept-Encoding header, ties go to the better ratio"""
+        if not accept_encoding or self.min_size <= 0:
+            return None
+        weights = {}
+        for item in accept_encoding.split(","):
+            coding, _, params = item.strip().partition(";")
+            quality = 1.0
+            params = params.strip()
+            if params.startswith("q="):
+                try:
+                    quality = float(params[2:])
+                except ValueError:
+                    quality = 0.0
+            weights[coding.strip().lower()] = quality
+        best, best_quality = None, 0.0
+        for coding in self.codings:
+            quality = weights.get(coding, weights.get("*", 0.0))
+            if quality > best_quality:
+                best, best_quality = coding, quality
+        return best
+
+    def compress(self, body: bytes, coding: str) -> bytes:
+        if coding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+
+
+def coded_etag(etag: str, coding: Optional[str]) -> str:
+    # Each representation needs its own strong validator
+    return etag if coding is None else f'{etag[:-1]}-{coding}"'
+
+
+def cached_json_response(entry: CachedResponse, request: Request,
+                         compressor: Optional[ResponseCompressor] = None) -> Response:
+    """Serve a cached body, compressed when the client accepts it, or 304 when it holds the same ETag"""
+    coding = None
+    if compressor is not None and len(entry.body) >= compressor.min_size:
+        coding = compressor.negotiate(request.headers.get("accept-encoding"))
+
+    headers = {**entry.headers, "ETag": coded_etag(entry.etag, coding), "Cache-Control": "no-cache"}
+    if compressor is not None:
+        headers["Vary"] = "Accept-Encoding"
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and headers["ETag"] in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    if coding is None:
+        return Response(content=entry.body, media_type="application/json", headers=headers)
+    body = entry.encoded.get(coding)
+    if body is None:
+        body = entry.encoded[coding] = compressor.compress(entry.body, coding)
+    headers["Content-Encoding"] = coding
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,66 @@
+"""
+Keys claimed for a limited time, shared by every worker: a bounded in-memory LRU answers the
+repeats this process has seen, a collection with a TTL index on expires_at is the source of truth.
+"""
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Generic, Optional, Tuple, TypeVar
+
+from pymongo.errors import DuplicateKeyError
+
+
+T = TypeVar("T")
+
+
+class RecentEntries(Generic[T]):
+    """Size-bounded LRU whose entries expire after their own TTL"""
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        # key -> (value, monotonic expiry)
+        self._entries: "OrderedDict[str, Tuple[T, float]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[T]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key: str, value: T, ttl: float):
+        self._entries[key] = (value, time.monotonic() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def pop(self, key: str):
+        self._entries.pop(key, None)
+
+
+async def claim_key(collection, key: str, fields: Dict[str, Any], now: datetime,
+                    expires_at: datetime) -> Optional[Dict[str, Any]]:
+    """Store fields under key until expires_at, returns the live record when another claim holds it.
+
+    The key is the _id, so concurrent workers race on a unique index. The TTL monitor deletes
+    lazily, an expired record that is still present is taken over.
+    """
+    try:
+        await collection.insert_one({"_id": key, **fields, "expires_at": expires_at})
+        return None
+    except DuplicateKeyError:
+        pass
+    taken = await collection.find_one_and_update(
+        {"_id": key, "expires_at": {"$lte": now}},
+        {"$set": {**fields, "expires_at": expires_at}},
+    )
+    if taken is not None:
+        return None
+    # None as well when the record was deleted in between, the key is free again
+    return await collection.find_one({"_id": key})
@@ -0,0 +1,71 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict
+
+from pymongo.read_preferences import Nearest, Primary, PrimaryPreferred, Secondary, SecondaryPreferred
+
+
+logger = logging.getLogger(__name__)
+
+
+READ_PREFERENCES = {
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+
+
+def _int_env(name: str, default: int) -> int:
+    return int(os.environ.get(name, str(default)))
+
+
+def client_options() -> Dict[str, Any]:
+    """Motor client settings from the environment, tuned for several uvicorn workers per host"""
+    options = {
+        "maxPoolSize": _int_env('MONGO_MAX_POOL_SIZE', 50),
+        "minPoolSize": _int_env('MONGO_MIN_POOL_SIZE', 5),
+        "maxIdleTimeMS": _int_env('MONGO_MAX_IDLE_TIME_MS', 300000),
+        # Fail fast instead of hanging requests when the cluster or the pool is unavailable
+        "serverSelectionTimeoutMS": _int_env('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000),
+        "connectTimeoutMS": _int_env('MONGO_CONNECT_TIMEOUT_MS', 5000),
+        "socketTimeoutMS": _int_env('MONGO_SOCKET_TIMEOUT_MS', 30000),
+        "waitQueueTimeoutMS": _int_env('MONGO_WAIT_QUEUE_TIMEOUT_MS', 5000),
+        "retryWrites": True,
+        "retryReads": True,
+    }
+    # zstd needs the zstandard package, snappy needs python-snappy; unavailable ones are skipped
+    compressors = os.environ.get('MONGO_COMPRESSORS', 'zstd,zlib').strip()
+    if compressors and compressors.lower() != 'none':
+        options["compressors"] = compressors
+    return options
+
+
+def read_preference_for_reads():
+    """Read preference used by the GET endpoints (MONGO_READ_PREFERENCE, default secondaryPreferred)"""
+    mode = os.environ.get('MONGO_READ_PREFERENCE', 'secondaryPreferred')
+    if mode == 'primary':
+        return Primary()
+    # -1 means no staleness limit, otherwise it must be at least 90 seconds
+    return READ_PREFERENCES[mode](max_staleness=_int_env('MONGO_MAX_STALENESS_SECONDS', -1))
+
+
+async def warm_up(client, connections: int, timeout: float = 10.0) -> Dict[str, Any]:
+    """Ping the deployment over several connections at once so the pool is open before traffic arrives"""
+    started = time.perf_counter()
+    await asyncio.wait_for(
+        asyncio.gather(*(client.admin.command("ping") for _ in range(max(1, connections)))),
+        timeout=timeout,
+    )
+    elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+    logger.info(f"MongoDB ready, warmed {connections} connections in {elapsed_ms} ms")
+    return {"connections": connections, "elapsed_ms": elapsed_ms}
+
+
+async def ping(client, timeout: float = 2.0) -> float:
+    """Round-trip time of a ping in milliseconds, raises when the deployment is unreachable"""
+    started = time.perf_counter()
+    await asyncio.wait_for(client.admin.command("ping"), timeout=timeout)
+    return round((time.perf_counter() - started) * 1000, 2)
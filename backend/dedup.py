@@ -0,0 +1,67 @@
+import hashlib
+import re
+import unicodedata
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from claims import RecentEntries, claim_key
+
+
+_NON_WORD = re.compile(r"[\W_]+", re.UNICODE)
+
+
+def normalize_text(value: str) -> str:
+    """Lowercase, strip diacritics and punctuation, collapse whitespace"""
+    decomposed = unicodedata.normalize("NFKD", value.casefold())
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return " ".join(_NON_WORD.sub(" ", stripped).split())
+
+
+def submission_fingerprint(name: str, email: str, message: str) -> str:
+    normalized = "\x1f".join([normalize_text(name), email.strip().lower(), normalize_text(message)])
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+class SubmissionDeduplicator:
+    """Time-windowed fingerprint index: bounded in-memory LRU in front of a TTL collection"""
+
+    def __init__(self, collection, window_seconds: float = 600.0, max_entries: int = 10000):
+        self.collection = collection
+        self.window_seconds = window_seconds
+        # fingerprint -> message id
+        self._recent: RecentEntries[str] = RecentEntries(max_entries)
+        self.duplicates = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.window_seconds > 0
+
+    async def claim(self, fingerprint: str, message_id: str) -> Optional[str]:
+        """Register a new submission, returns the original message id when it is a duplicate"""
+        if not self.enabled:
+            return None
+
+        existing = self._recent.get(fingerprint)
+        if existing is not None:
+            self.duplicates += 1
+            return existing
+
+        now = datetime.now(timezone.utc)
+        original = await claim_key(
+            self.collection, fingerprint, {"message_id": message_id}, now, now + timedelta(seconds=self.window_seconds)
+        )
+        if original is not None:
+            remaining = (original["expires_at"] - now).total_seconds()
+            self._recent.put(fingerprint, original["message_id"], max(remaining, 0))
+            self.duplicates += 1
+            return original["message_id"]
+
+        self._recent.put(fingerprint, message_id, self.window_seconds)
+        return None
+
+    async def release(self, fingerprint: str, message_id: str):
+        """Forget a claim whose message could not be stored"""
+        if not self.enabled:
+            return
+        self._recent.pop(fingerprint)
+        await self.collection.delete_one({"_id": fingerprint, "message_id": message_id})
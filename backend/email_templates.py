@@ -0,0 +1,71 @@
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, NamedTuple, Tuple
+
+from jinja2 import Environment, FileSystemLoader, StrictUndefined, Template, select_autoescape
+
+
+# Every email template consists of these parts, e.g. sk/contact_notification.html
+PARTS = ("subject.txt", "html", "txt")
+
+
+class RenderedEmail(NamedTuple):
+    subject: str
+    html: str
+    text: str
+
+
+def format_datetime(value: datetime) -> str:
+    return value.strftime('%d.%m.%Y %H:%M:%S')
+
+
+class EmailTemplates:
+    """Email templates compiled once and cached per (locale, name), HTML parts are auto-escaped"""
+
+    def __init__(self, root: Path, default_locale: str = "sk"):
+        self.root = Path(root)
+        self.default_locale = default_locale
+        self.env = Environment(
+            loader=FileSystemLoader(str(self.root)),
+            autoescape=select_autoescape(enabled_extensions=("html",), default_for_string=False),
+            undefined=StrictUndefined,
+            trim_blocks=True,
+            lstrip_blocks=True,
+            keep_trailing_newline=True,
+            # Templates never change at runtime, skip the mtime checks on every lookup
+            auto_reload=False,
+        )
+        self.env.filters["datetime"] = format_datetime
+        self._compiled: Dict[Tuple[str, str], Tuple[Template, Template, Template]] = {}
+
+    def load(self) -> int:
+        """Compile every template found under root, returns the number of (locale, name) pairs"""
+        for locale_dir in sorted(p for p in self.root.iterdir() if p.is_dir()):
+            names = {path.name[:-len(".subject.txt")] for path in locale_dir.glob("*.subject.txt")}
+            for name in names:
+                self._compile(locale_dir.name, name)
+        return len(self._compiled)
+
+    def _compile(self, locale: str, name: str) -> Tuple[Template, Template, Template]:
+        parts = tuple(self.env.get_template(f"{locale}/{name}.{part}") for part in PARTS)
+        self._compiled[(locale, name)] = parts
+        return parts
+
+    def get(self, name: str, locale: str = None) -> Tuple[Template, Template, Template]:
+        locale = locale or self.default_locale
+        compiled = self._compiled.get((locale, name))
+        if compiled is None:
+            # Locales without this template fall back to the default locale
+            if locale == self.default_locale or (self.root / locale / f"{name}.html").exists():
+                compiled = self._compile(locale, name)
+            else:
+                compiled = self._compiled[(locale, name)] = self.get(name, self.default_locale)
+        return compiled
+
+    def render(self, name: str, context: Dict[str, Any], locale: str = None) -> RenderedEmail:
+        subject, html, text = self.get(name, locale)
+        return RenderedEmail(
+            " ".join(subject.render(context).split()),
+            html.render(context),
+            text.render(context),
+        )
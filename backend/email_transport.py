@@ -0,0 +1,210 @@
+import asyncio
+import logging
+import time
+from email.message import EmailMessage
+from email.utils import make_msgid
+from typing import Any, Dict, List, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+class DeliveryError(Exception):
+    pass
+
+
+class PermanentDeliveryError(DeliveryError):
+    """The provider rejected the email itself, retrying will not help"""
+
+
+class CircuitOpenError(DeliveryError):
+    def __init__(self, retry_after: float):
+        super().__init__(f"Email circuit breaker is open, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class ResendTransport:
+    """Resend REST API over a pooled, keep-alive async HTTP client"""
+
+    API_URL = "https://api.resend.com/emails"
+
+    def __init__(self, api_key: str, max_connections: int = 10, timeout: float = 10.0):
+        import httpx
+
+        self.api_key = api_key
+        self.client = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            headers={"Authorization": f"Bearer {api_key}"},
+        )
+
+    async def send(self, params: Dict[str, Any]) -> str:
+        response = await self.client.post(self.API_URL, json=params)
+        if response.status_code == 429 or response.status_code >= 500:
+            raise DeliveryError(f"Resend returned {response.status_code}: {response.text[:200]}")
+        if response.status_code >= 400:
+            raise PermanentDeliveryError(f"Resend rejected the email ({response.status_code}): {response.text[:200]}")
+        return response.json().get('id', 'N/A')
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+class SmtpTransport:
+    """SMTP delivery over a small pool of reused aiosmtplib connections"""
+
+    def __init__(self, hostname: str, port: int = 587, username: Optional[str] = None, password: Optional[str] = None,
+                 use_tls: bool = False, start_tls: bool = True, pool_size: int = 2, timeout: float = 10.0):
+        self.options = {
+            "hostname": hostname,
+            "port": port,
+            "username": username or None,
+            "password": password or None,
+            "use_tls": use_tls,
+            "start_tls": start_tls and not use_tls,
+            "timeout": timeout,
+        }
+        self.pool_size = pool_size
+        self._idle: "asyncio.Queue" = asyncio.Queue()
+        self._created = 0
+
+    async def _acquire(self):
+        import aiosmtplib
+
+        if self._idle.empty() and self._created < self.pool_size:
+            self._created += 1
+            return aiosmtplib.SMTP(**self.options)
+        return await self._idle.get()
+
+    async def send(self, params: Dict[str, Any]) -> str:
+        import aiosmtplib
+
+        message = build_mime_message(params)
+        smtp = await self._acquire()
+        try:
+            if not smtp.is_connected:
+                await smtp.connect()
+            await smtp.send_message(message)
+        except aiosmtplib.SMTPRecipientsRefused as e:
+            raise PermanentDeliveryError(f"SMTP recipients refused: {e}")
+        except BaseException:
+            # Drop a possibly broken or timed out connection, the next send reconnects
+            try:
+                smtp.close()
+            except Exception:
+                pass
+            raise
+        finally:
+            self._idle.put_nowait(smtp)
+        return message["Message-ID"]
+
+    async def aclose(self):
+        while not self._idle.empty():
+            smtp = self._idle.get_nowait()
+            if smtp.is_connected:
+                try:
+                    await smtp.quit()
+                except Exception:
+                    smtp.close()
+
+
+def build_mime_message(params: Dict[str, Any]) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = params["from"]
+    message["To"] = ", ".join(params["to"])
+    message["Subject"] = params["subject"]
+    message["Message-ID"] = make_msgid(domain=params["from"].rsplit("@", 1)[-1].rstrip(">"))
+    message.set_content(params.get("text") or "")
+    if params.get("html"):
+        message.add_alternative(params["html"], subtype="html")
+    return message
+
+
+class FakeTransport:
+    """Local transport that records every email instead of delivering it (for tests)"""
+
+    def __init__(self, fail_times: int = 0, delay: float = 0.0):
+        self.sent: List[Dict[str, Any]] = []
+        self.fail_times = fail_times
+        self.delay = delay
+
+    async def send(self, params: Dict[str, Any]) -> str:
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.fail_times > 0:
+            self.fail_times -= 1
+            raise DeliveryError("FakeTransport: simulated delivery failure")
+        self.sent.append(params)
+        return f"fake-{len(self.sent)}"
+
+    async def aclose(self):
+        pass
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures, then lets a single trial call through after a cool-down"""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 60.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def before_call(self):
+        state = self.state
+        if state == "open" or (state == "half_open" and self._trial_in_flight):
+            remaining = self.reset_timeout - (time.monotonic() - self.opened_at)
+            raise CircuitOpenError(max(remaining, 1.0))
+        if state == "half_open":
+            self._trial_in_flight = True
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                logger.error(f"Email circuit breaker opened after {self.failures} consecutive failures")
+            self.opened_at = time.monotonic()
+
+
+class ReliableTransport:
+    """Wraps a transport with a per-send timeout and a circuit breaker"""
+
+    def __init__(self, transport, timeout: float = 15.0, breaker: Optional[CircuitBreaker] = None):
+        self.transport = transport
+        self.timeout = timeout
+        self.breaker = breaker or CircuitBreaker()
+
+    async def send(self, params: Dict[str, Any]) -> str:
+        self.breaker.before_call()
+        try:
+            result = await asyncio.wait_for(self.transport.send(params), timeout=self.timeout)
+        except PermanentDeliveryError:
+            # The provider answered, so it is healthy
+            self.breaker.record_success()
+            raise
+        except asyncio.TimeoutError:
+            self.breaker.record_failure()
+            raise DeliveryError(f"Email send timed out after {self.timeout:g}s")
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return result
+
+    async def aclose(self):
+        await self.transport.aclose()
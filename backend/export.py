@@ -0,0 +1,67 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List
+
+
+CONTACT_EXPORT_FIELDS = ["id", "name", "email", "phone", "message", "created_at", "status"]
+
+# Spreadsheet apps evaluate cells starting with these as formulas
+_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def json_default(value: Any):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, str) and value.startswith(_FORMULA_PREFIXES):
+        # Submitted text is shown as text, e.g. a message "=HYPERLINK(...)" is not a live link
+        return "'" + value
+    return value
+
+
+async def stream_ndjson(cursor, batch_size: int) -> AsyncIterator[bytes]:
+    """Yield one NDJSON chunk per cursor batch"""
+    lines: List[str] = []
+    async for doc in cursor:
+        lines.append(json.dumps(doc, ensure_ascii=False, default=json_default))
+        if len(lines) >= batch_size:
+            yield ("\n".join(lines) + "\n").encode()
+            lines = []
+    if lines:
+        yield ("\n".join(lines) + "\n").encode()
+
+
+async def stream_csv(cursor, fields: List[str], batch_size: int) -> AsyncIterator[bytes]:
+    """Yield a header row, then one CSV chunk per cursor batch"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # UTF-8 BOM so spreadsheet apps pick the right encoding for Slovak diacritics
+    writer.writerow(fields)
+    yield ("\ufeff" + buffer.getvalue()).encode()
+    buffer.seek(0)
+    buffer.truncate()
+
+    rows = 0
+    async for doc in cursor:
+        writer.writerow([_csv_value(doc.get(field)) for field in fields])
+        rows += 1
+        if rows >= batch_size:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+            rows = 0
+    if rows:
+        yield buffer.getvalue().encode()
+
+
+def export_projection(fields: List[str]) -> Dict[str, int]:
+    return {"_id": 0, **{field: 1 for field in fields}}
@@ -0,0 +1,170 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import AsyncIterator, Callable, Dict, Optional, Set, Tuple
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from metrics import contact_feed_clients
+
+
+logger = logging.getLogger(__name__)
+
+# New leads only, status changes and deletes are not part of the feed
+PIPELINE = [{"$match": {"operationType": "insert"}}]
+
+# Error codes meaning a resume token can no longer be used
+# (ChangeStreamHistoryLost, ChangeStreamFatalError, InvalidResumeToken)
+RESUME_FAILED_CODES = {260, 280, 286}
+
+
+class Subscriber:
+    def __init__(self, queue_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(queue_size)
+
+    def drop(self):
+        # Replace the backlog with an end marker, the client resumes from its last event id
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+
+def sse_event(event: str, data: bytes, event_id: Optional[str] = None) -> bytes:
+    head = f"id: {event_id}\n" if event_id else ""
+    return f"{head}event: {event}\n".encode() + b"data: " + data + b"\n\n"
+
+
+class ContactFeed:
+    """One change stream on contact_messages fanned out to every connected client.
+
+    Events carry the change stream resume token as their id. A reconnecting client sends it
+    back as Last-Event-ID and gets only what it missed: from the in-memory buffer of recent
+    events, or from a private stream resumed after the token when it is older than that.
+    """
+
+    def __init__(self, collection, serialize: Callable[[Dict], bytes], buffer_size: int = 1000,
+                 queue_size: int = 256, max_clients: int = 100):
+        self.collection = collection
+        self.serialize = serialize
+        self.buffer_size = buffer_size
+        self.queue_size = queue_size
+        self.max_clients = max_clients
+        # resume token -> encoded message, oldest first
+        self._recent: "OrderedDict[str, bytes]" = OrderedDict()
+        self._subscribers: Set[Subscriber] = set()
+        self._last_token: Optional[dict] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def clients(self) -> int:
+        return len(self._subscribers)
+
+    @property
+    def full(self) -> bool:
+        return self.clients >= self.max_clients
+
+    def _publish(self, token: str, data: bytes):
+        self._recent[token] = data
+        while len(self._recent) > self.buffer_size:
+            self._recent.popitem(last=False)
+        for subscriber in list(self._subscribers):
+            try:
+                subscriber.queue.put_nowait((token, data))
+            except asyncio.QueueFull:
+                # Never let one slow client hold up the others
+                self._subscribers.discard(subscriber)
+                subscriber.drop()
+        contact_feed_clients.set(self.clients)
+
+    async def _watch(self):
+        delay = 1.0
+        while True:
+            try:
+                async with self.collection.watch(PIPELINE, resume_after=self._last_token) as stream:
+                    delay = 1.0
+                    async for change in stream:
+                        self._last_token = change["_id"]
+                        self._publish(change["_id"]["_data"], self.serialize(change["fullDocument"]))
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as e:
+                if e.code in RESUME_FAILED_CODES:
+                    # The oplog moved past our position, carry on from now
+                    self._last_token = None
+                logger.error(f"Contact feed change stream failed: {str(e)}")
+            except PyMongoError as e:
+                logger.error(f"Contact feed change stream failed: {str(e)}")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30.0)
+
+    def _ensure_watching(self):
+        # Started with the first client, no change stream is open while nobody listens
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._watch())
+
+    async def _catch_up(self, last_event_id: str) -> AsyncIterator[Tuple[str, bytes]]:
+        """Events after last_event_id, from the buffer or a private resumed stream"""
+        if last_event_id in self._recent:
+            tokens = list(self._recent)
+            for token in tokens[tokens.index(last_event_id) + 1:]:
+                yield token, self._recent[token]
+            return
+        async with self.collection.watch(PIPELINE, resume_after={"_data": last_event_id}) as stream:
+            while True:
+                change = await stream.try_next()
+                if change is None:
+                    return
+                token = change["_id"]["_data"]
+                yield token, self.serialize(change["fullDocument"])
+                if token in self._recent:
+                    # Reached the shared stream, the buffer has the rest
+                    async for item in self._catch_up(token):
+                        yield item
+                    return
+
+    async def events(self, last_event_id: Optional[str] = None, heartbeat: float = 15.0) -> AsyncIterator[bytes]:
+        """Server-sent events for one client until it disconnects"""
+        subscriber = Subscriber(self.queue_size)
+        # Subscribe before catching up so nothing published meanwhile is lost
+        self._subscribers.add(subscriber)
+        contact_feed_clients.set(self.clients)
+        self._ensure_watching()
+        sent: Set[str] = set()
+        try:
+            yield b"retry: 3000\n\n"
+            if last_event_id:
+                try:
+                    async for token, data in self._catch_up(last_event_id):
+                        sent.add(token)
+                        yield sse_event("contact", data, token)
+                except OperationFailure as e:
+                    if e.code not in RESUME_FAILED_CODES:
+                        raise
+                    # Too old to resume, the client reloads the list instead
+                    yield sse_event("reset", b"{}")
+
+            while True:
+                try:
+                    item = await asyncio.wait_for(subscriber.queue.get(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    # Keeps proxies from closing an idle connection
+                    yield b": ping\n\n"
+                    continue
+                if item is None:
+                    # Ending the response makes EventSource reconnect with its Last-Event-ID
+                    logger.warning("Contact feed client fell behind and was disconnected")
+                    return
+                token, data = item
+                if token in sent:
+                    sent.discard(token)
+                    continue
+                yield sse_event("contact", data, token)
+        finally:
+            self._subscribers.discard(subscriber)
+            contact_feed_clients.set(self.clients)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
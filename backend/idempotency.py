@@ -0,0 +1,229 @@
+import hashlib
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from claims import RecentEntries, claim_key
+
+
+HEADER = b"idempotency-key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+
+# Responses that say nothing about the outcome, a retry with the same key runs the request again
+RETRYABLE_STATUSES = {408, 409, 425, 429}
+
+IN_PROGRESS_MESSAGE = "Požiadavka s týmto kľúčom sa práve spracováva. Skúste to prosím o chvíľu."
+KEY_REUSED_MESSAGE = "Kľúč Idempotency-Key bol použitý pre inú požiadavku."
+INVALID_KEY_MESSAGE = "Neplatný kľúč Idempotency-Key."
+
+
+class StoredResponse(NamedTuple):
+    fingerprint: str
+    status: int
+    headers: List[Tuple[str, str]]
+    body: bytes
+
+
+class IdempotencyStore:
+    """Completed responses by idempotency key: bounded in-memory LRU in front of a TTL collection"""
+
+    def __init__(self, collection=None, ttl_seconds: float = 86400.0, lock_seconds: float = 60.0,
+                 max_entries: int = 10000):
+        # Set once the database is connected
+        self.collection = collection
+        self.ttl_seconds = ttl_seconds
+        # An unfinished claim blocks the key for this long, e.g. when its worker died
+        self.lock_seconds = lock_seconds
+        self._recent: RecentEntries[StoredResponse] = RecentEntries(max_entries)
+        self.replays = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0
+
+    def lookup_local(self, key: str) -> Optional[StoredResponse]:
+        """The response when it is still held in memory, without a database round trip"""
+        return self._recent.get(key)
+
+    async def lookup(self, key: str) -> Optional[StoredResponse]:
+        entry = self.lookup_local(key)
+        if entry is not None:
+            return entry
+
+        now = datetime.now(timezone.utc)
+        doc = await self.collection.find_one({"_id": key, "state": "done", "expires_at": {"$gt": now}})
+        if doc is None:
+            return None
+        entry = StoredResponse(doc["fingerprint"], doc["status"], [tuple(header) for header in doc["headers"]],
+                               bytes(doc["body"]))
+        self._recent.put(key, entry, (doc["expires_at"] - now).total_seconds())
+        return entry
+
+    async def claim(self, key: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """Reserve the key for this request, returns the existing record when it is taken"""
+        now = datetime.now(timezone.utc)
+        return await claim_key(self.collection, key, {"state": "in_progress", "fingerprint": fingerprint},
+                               now, now + timedelta(seconds=self.lock_seconds))
+
+    async def complete(self, key: str, fingerprint: str, status: int, headers: List[Tuple[str, str]], body: bytes):
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=self.ttl_seconds)
+        # Upserted, the claim may have been taken over and released by another worker meanwhile
+        await self.collection.update_one({"_id": key}, {"$set": {
+            "state": "done",
+            "fingerprint": fingerprint,
+            "status": status,
+            "headers": [list(header) for header in headers],
+            "body": body,
+            "expires_at": expires_at,
+        }}, upsert=True)
+        self._recent.put(key, StoredResponse(fingerprint, status, headers, body), self.ttl_seconds)
+
+    async def release(self, key: str):
+        """Drop an unfinished claim so a retry can run the request again"""
+        await self.collection.delete_one({"_id": key, "state": "in_progress"})
+
+
+def _json_error(status: int, message: str, extra_headers: Optional[Dict[str, str]] = None):
+    body = json.dumps({"detail": {"success": False, "message": message}}, ensure_ascii=False).encode()
+    headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    headers += [(name.lower().encode(), value.encode()) for name, value in (extra_headers or {}).items()]
+    return {"type": "http.response.start", "status": status, "headers": headers}, {"type": "http.response.body", "body": body}
+
+
+async def _read_body(receive) -> Optional[bytes]:
+    """The whole request body, None when the client disconnected first"""
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return None
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            return b"".join(chunks)
+
+
+def _replaying_receive(body: bytes, receive):
+    """Hands an already read body to the app again"""
+    delivered = False
+
+    async def replay_body():
+        nonlocal delivered
+        if delivered:
+            # Later receives only wait for the client to disconnect
+            return await receive()
+        delivered = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    return replay_body
+
+
+class IdempotencyMiddleware:
+    """Replays the stored response of POST requests that repeat an Idempotency-Key header.
+
+    The key is scoped to the path and bound to a hash of the request body; reusing it for a
+    different body is rejected with 422, and a retry racing the first attempt gets 409.
+    With local_only the middleware only answers from the in-memory cache and passes every
+    other request on; an instance in front of admission control serves cheap replays of
+    recent retries, one behind it does the database lookup and claim.
+    """
+
+    def __init__(self, app, store: IdempotencyStore, paths, on_replay=None, local_only: bool = False):
+        self.app = app
+        self.store = store
+        self.paths = set(paths)
+        self.on_replay = on_replay
+        self.local_only = local_only
+
+    async def __call__(self, scope, receive, send):
+        if (scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths
+                or not self.store.enabled):
+            await self.app(scope, receive, send)
+            return
+        raw_key = next((value for name, value in scope.get("headers", []) if name == HEADER), None)
+        if raw_key is None:
+            await self.app(scope, receive, send)
+            return
+
+        key = raw_key.decode("latin-1").strip()
+        if not key or len(key) > MAX_KEY_LENGTH or not key.isprintable():
+            await self._send(send, *_json_error(400, INVALID_KEY_MESSAGE))
+            return
+
+        # The body is read here to fingerprint it, then handed to the app unchanged
+        body = await _read_body(receive)
+        if body is None:
+            return
+        fingerprint = hashlib.sha256(body).hexdigest()
+        store_key = f"{scope['path']}:{key}"
+
+        if self.local_only:
+            stored = self.store.lookup_local(store_key)
+            if stored is None:
+                await self.app(scope, _replaying_receive(body, receive), send)
+                return
+        else:
+            stored = await self.store.lookup(store_key)
+        if stored is None:
+            existing = await self.store.claim(store_key, fingerprint)
+            if existing is not None:
+                if existing.get("fingerprint") != fingerprint:
+                    await self._send(send, *_json_error(422, KEY_REUSED_MESSAGE))
+                    return
+                if existing.get("state") == "done":
+                    # Completed by another worker between the lookup and the claim
+                    stored = await self.store.lookup(store_key)
+                    if stored is not None:
+                        await self._replay(send, scope["path"], stored)
+                        return
+                await self._send(send, *_json_error(409, IN_PROGRESS_MESSAGE, {"Retry-After": "1"}))
+                return
+            await self._execute(scope, receive, send, body, store_key, fingerprint)
+            return
+
+        if stored.fingerprint != fingerprint:
+            await self._send(send, *_json_error(422, KEY_REUSED_MESSAGE))
+            return
+        await self._replay(send, scope["path"], stored)
+
+    async def _execute(self, scope, receive, send, body: bytes, store_key: str, fingerprint: str):
+        response = {"status": 500, "headers": [], "body": []}
+
+        async def capture(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["headers"] = [
+                    (name.decode("latin-1"), value.decode("latin-1")) for name, value in message.get("headers", [])
+                ]
+            elif message["type"] == "http.response.body":
+                response["body"].append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, _replaying_receive(body, receive), capture)
+        except BaseException:
+            await self.store.release(store_key)
+            raise
+
+        status = response["status"]
+        if status >= 500 or status in RETRYABLE_STATUSES:
+            await self.store.release(store_key)
+            return
+        await self.store.complete(store_key, fingerprint, status, response["headers"], b"".join(response["body"]))
+
+    async def _replay(self, send, path: str, stored: StoredResponse):
+        self.store.replays += 1
+        if self.on_replay is not None:
+            self.on_replay(path)
+        headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in stored.headers]
+        headers.append((REPLAYED_HEADER.lower().encode(), b"true"))
+        await self._send(
+            send,
+            {"type": "http.response.start", "status": stored.status, "headers": headers},
+            {"type": "http.response.body", "body": stored.body},
+        )
+
+    @staticmethod
+    async def _send(send, start, body):
+        await send(start)
+        await send(body)
@@ -0,0 +1,102 @@
+import asyncio
+import logging
+from typing import Any, Dict, List
+
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+
+
+logger = logging.getLogger(__name__)
+
+# Index definitions per collection, created idempotently at startup
+INDEXES: Dict[str, List[IndexModel]] = {
+    "contact_messages": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        # Serves sort("created_at", -1) and the (created_at, id) keyset pagination
+        IndexModel([("created_at", DESCENDING), ("id", DESCENDING)], name="created_at_id"),
+        IndexModel([("status", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], name="status_created_at_id"),
+        IndexModel([("email", ASCENDING), ("created_at", DESCENDING)], name="email_created_at"),
+        # Finds messages whose status moved since the last analytics refresh
+        IndexModel([("status_changed_at", DESCENDING)], name="status_changed_at", sparse=True),
+        # Messages saved without their notification reaching the outbox, see recover_notifications
+        IndexModel([("created_at", ASCENDING)], name="notification_pending",
+                   partialFilterExpression={"notification_pending": True}),
+        # Text index v3 is case and diacritic insensitive, so "novak" matches "Novák".
+        # Slovak has no stemmer in MongoDB, "none" keeps tokens unstemmed and stop words in.
+        IndexModel(
+            [("name", TEXT), ("email", TEXT), ("message", TEXT)],
+            name="contact_text",
+            weights={"name": 5, "email": 5, "message": 1},
+            default_language="none",
+            textIndexVersion=3,
+        ),
+    ],
+    "status_checks": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("timestamp", DESCENDING)], name="timestamp"),
+        # Each check expires at its own expires_at, set from STATUS_CHECK_TTL_DAYS when written
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "contact_messages_archive": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("created_at", DESCENDING)], name="created_at"),
+    ],
+    "contact_fingerprints": [
+        # Each fingerprint expires at its own expires_at, whatever the dedup window
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "idempotency_keys": [
+        # Completed responses expire after IDEMPOTENCY_TTL_SECONDS, unfinished claims after their lock
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "rate_limits": [
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "analytics_rollups": [
+        # Required by the $merge of the refresh, also serves the range reads
+        IndexModel([("source", ASCENDING), ("unit", ASCENDING), ("bucket", ASCENDING)],
+                   name="source_unit_bucket", unique=True),
+    ],
+    "email_outbox": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("status", ASCENDING), ("next_attempt_at", ASCENDING)], name="status_next_attempt_at"),
+        # At most one notification per contact message, queueing it again is a no-op
+        IndexModel([("kind", ASCENDING), ("ref", ASCENDING)], name="kind_ref_unique", unique=True,
+                   partialFilterExpression={"ref": {"$type": "string"}}),
+        # Sent and failed records are removed OUTBOX_RETENTION_DAYS after they finished
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+}
+
+
+async def ensure_indexes(db) -> Dict[str, List[str]]:
+    """Create every declared index, existing indexes with the same spec are left alone"""
+    # One round trip per collection, all sent at once
+    names = await asyncio.gather(*(db[collection].create_indexes(models) for collection, models in INDEXES.items()))
+    created = dict(zip(INDEXES, names))
+    for collection, indexes in created.items():
+        logger.info(f"Ensured indexes on {collection}: {', '.join(indexes)}")
+    return created
+
+
+async def index_report(db) -> Dict[str, Any]:
+    """Report size and usage counters of every index on the managed collections"""
+    report = {}
+    for collection in INDEXES:
+        stats = await db.command("collStats", collection)
+        usage = {}
+        async for row in db[collection].aggregate([{"$indexStats": {}}]):
+            usage[row["name"]] = {
+                "ops": row["accesses"]["ops"],
+                "since": row["accesses"]["since"],
+            }
+        sizes = stats.get("indexSizes", {})
+        report[collection] = {
+            "documents": stats.get("count", 0),
+            "data_size": stats.get("size", 0),
+            "total_index_size": stats.get("totalIndexSize", 0),
+            "indexes": [
+                {"name": name, "size": size, **usage.get(name, {"ops": None, "since": None})}
+                for name, size in sizes.items()
+            ],
+        }
+    return report
@@ -0,0 +1,65 @@
+"""
+Building blocks of the scheduled background jobs: a lease document that keeps a run on one
+worker at a time, and the loop running a job every interval seconds.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+
+logger = logging.getLogger(__name__)
+
+
+async def acquire_lease(collection, key: str, now: datetime, seconds: float) -> Optional[Dict[str, Any]]:
+    """Lease the document key, returns its previous state ({} when new) or None when another worker holds it"""
+    try:
+        return await collection.find_one_and_update(
+            {"_id": key, "$or": [{"lease_until": {"$lt": now}}, {"lease_until": None}]},
+            {"$set": {"lease_until": now + timedelta(seconds=seconds)}},
+            upsert=True,
+            return_document=ReturnDocument.BEFORE,
+        ) or {}
+    except DuplicateKeyError:
+        # The document exists and its lease has not expired, the upsert raced the unique _id
+        return None
+
+
+async def release_lease(collection, key: str):
+    """Give the lease back so the next run can start right away"""
+    await collection.update_one({"_id": key}, {"$set": {"lease_until": None}})
+
+
+class PeriodicJob:
+    """Runs tick() every interval seconds in a background task, a failed tick is logged and retried next time"""
+
+    name = "Background job"
+
+    def __init__(self, interval: float):
+        # 0 disables the loop, the job can still be run on demand
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def tick(self):
+        raise NotImplementedError
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.tick()
+            except Exception as e:
+                logger.error(f"{self.name} failed: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
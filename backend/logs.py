@@ -0,0 +1,293 @@
+"""
+Logging pipeline: records are queued by the event loop and formatted and written by a
+background thread, as JSON lines (or plain text) with the request id of the request that
+emitted them. Email addresses and phone numbers are masked in the output.
+"""
+import atexit
+import copy
+import json
+import logging
+import queue
+import random
+import re
+import sys
+import time
+import uuid
+import zlib
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+from pymongo import monitoring
+
+
+logger = logging.getLogger(__name__)
+
+REQUEST_ID_HEADER = b"x-request-id"
+MAX_REQUEST_ID_LENGTH = 128
+_VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._:-]+$")
+
+EMAIL_PATTERN = re.compile(r"\b([A-Za-z0-9._%+-])[A-Za-z0-9._%+-]*@([A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*\.[A-Za-z]{2,})\b")
+# International numbers and Slovak national ones (0901 234 567), not dates or ids
+PHONE_PATTERN = re.compile(r"(?<![\w+])(?:\+|00)\d[\d ./-]{6,16}\d(?!\w)|(?<![\w.-])0\d{2,3}[ /-]?\d{3}[ -]?\d{3}(?![\w-])")
+
+# Attributes every LogRecord has, anything else was passed with extra=
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "request_id"}
+
+
+class RequestTrace:
+    """What one request did, read by the slow request log"""
+
+    __slots__ = ("request_id", "mongo_commands", "mongo_seconds")
+
+    def __init__(self, request_id: str):
+        self.request_id = request_id
+        self.mongo_commands = 0
+        self.mongo_seconds = 0.0
+
+
+# Motor runs driver calls with a copy of the caller's context, so the trace is visible there too
+_trace: ContextVar[Optional[RequestTrace]] = ContextVar("request_trace", default=None)
+
+
+def current_request_id() -> Optional[str]:
+    trace = _trace.get()
+    return trace.request_id if trace is not None else None
+
+
+@contextmanager
+def request_context(request_id: Optional[str]):
+    """Log under the given request id, e.g. in a background worker handling that request's email"""
+    token = _trace.set(RequestTrace(request_id) if request_id else None)
+    try:
+        yield
+    finally:
+        _trace.reset(token)
+
+
+def _mask_email(match: re.Match) -> str:
+    return f"{match.group(1)}***@{match.group(2)}"
+
+
+def _mask_phone(match: re.Match) -> str:
+    digits = re.sub(r"\D", "", match.group(0))
+    prefix = "+" if match.group(0).startswith("+") else ""
+    return prefix + "*" * (len(digits) - 3) + digits[-3:]
+
+
+def redact(text: str) -> str:
+    """Mask email addresses and phone numbers, keeping enough to tell entries apart"""
+    if "@" in text:
+        text = EMAIL_PATTERN.sub(_mask_email, text)
+    return PHONE_PATTERN.sub(_mask_phone, text)
+
+
+class ContextFilter(logging.Filter):
+    """Stamps the request id on the record, in the thread that emitted it"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = current_request_id()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps a fraction of the INFO and DEBUG records of high-volume loggers.
+
+    Rates are per logger name prefix. Records of a request are kept or dropped together,
+    decided by a hash of its request id, so a sampled request can still be followed end to end.
+    Warnings and errors are never sampled.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        # Longest prefix first, "uvicorn.access" wins over "uvicorn"
+        self.rates = sorted(rates.items(), key=lambda item: len(item[0]), reverse=True)
+
+    def rate_for(self, name: str) -> float:
+        for prefix, rate in self.rates:
+            if name == prefix or name.startswith(prefix + "."):
+                return rate
+        return 1.0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO:
+            return True
+        rate = self.rate_for(record.name)
+        if rate >= 1.0:
+            return True
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            return zlib.crc32(request_id.encode()) % 10000 < rate * 10000
+        return random.random() < rate
+
+
+class _QueueHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only merge the arguments here, formatting and redaction happen on the listener thread.
+        # The exception is rendered now since its traceback does not outlive the handler.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        if getattr(record, "request_id", None) is None:
+            record.request_id = "-"
+        return redact(super().format(record))
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, request_id and any extra= fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return redact(json.dumps(entry, ensure_ascii=False, default=str))
+
+
+_listener: Optional[QueueListener] = None
+
+
+def parse_sample_rates(value: str) -> Dict[str, float]:
+    """"uvicorn.access=0.1,outbox=0.5" -> {"uvicorn.access": 0.1, "outbox": 0.5}"""
+    rates = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        name, _, rate = item.partition("=")
+        rates[name.strip()] = min(max(float(rate), 0.0), 1.0)
+    return rates
+
+
+def setup_logging(level: str = "INFO", fmt: str = "json", sample_rates: Optional[Dict[str, float]] = None) -> QueueListener:
+    """Route every logger through a queue to a background writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+
+    output = logging.StreamHandler(sys.stderr)
+    output.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+
+    handler = _QueueHandler(queue.SimpleQueue())
+    handler.addFilter(ContextFilter())
+    if sample_rates:
+        handler.addFilter(SamplingFilter(sample_rates))
+
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level.upper())
+    # uvicorn installs its own synchronous handlers, send its records through the queue as well
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers.clear()
+        uvicorn_logger.propagate = True
+
+    _listener = QueueListener(handler.queue, output, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+@atexit.register
+def _flush():
+    # Writes out what is still queued
+    if _listener is not None:
+        _listener.stop()
+
+
+class MongoCommandTracing(monitoring.CommandListener):
+    """Adds MongoDB round trips to the current request's trace and logs slow commands"""
+
+    def __init__(self, slow_seconds: float = 0.5):
+        self.slow_seconds = slow_seconds
+
+    def started(self, event):
+        pass
+
+    def _finish(self, event, result: str):
+        seconds = event.duration_micros / 1_000_000
+        trace = _trace.get()
+        if trace is not None:
+            trace.mongo_commands += 1
+            trace.mongo_seconds += seconds
+        if self.slow_seconds and seconds >= self.slow_seconds:
+            logger.warning(
+                f"Slow MongoDB {event.command_name} took {seconds * 1000:.0f} ms",
+                extra={"command": event.command_name, "database": event.database_name,
+                       "duration_ms": round(seconds * 1000, 1), "result": result},
+            )
+
+    def succeeded(self, event):
+        self._finish(event, "success")
+
+    def failed(self, event):
+        self._finish(event, "failure")
+
+
+class RequestContextMiddleware:
+    """Assigns every HTTP request a correlation id and logs the slow ones.
+
+    The id comes from the X-Request-ID header when the caller (e.g. the proxy) sent a usable
+    one, and is echoed in the response. Requests slower than slow_seconds are logged as a
+    warning with their status, duration and MongoDB time.
+    """
+
+    def __init__(self, app, slow_seconds: float = 1.0):
+        self.app = app
+        self.slow_seconds = slow_seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        raw = next((value for name, value in scope.get("headers", []) if name == REQUEST_ID_HEADER), b"")
+        request_id = raw.decode("latin-1")
+        if not request_id or len(request_id) > MAX_REQUEST_ID_LENGTH or not _VALID_REQUEST_ID.match(request_id):
+            request_id = uuid.uuid4().hex
+        trace = RequestTrace(request_id)
+        token = _trace.set(trace)
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(REQUEST_ID_HEADER, request_id.encode())]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            # Long-lived event streams are not slow requests
+            streaming = scope["path"].endswith("/stream")
+            if self.slow_seconds and elapsed >= self.slow_seconds and not streaming:
+                route = getattr(scope.get("route"), "path", None) or scope["path"]
+                logger.warning(
+                    f"Slow request {scope['method']} {route} returned {status['code']} in {elapsed * 1000:.0f} ms",
+                    extra={"method": scope["method"], "route": route, "status": status["code"],
+                           "duration_ms": round(elapsed * 1000, 1), "mongo_commands": trace.mongo_commands,
+                           "mongo_ms": round(trace.mongo_seconds * 1000, 1)},
+                )
+            _trace.reset(token)
@@ -0,0 +1,121 @@
+"""
+Backfill migration converting legacy ISO string timestamps to native BSON datetimes.
+
+Run from the backend directory:  python migrations.py [--batch-size 1000]
+The migration walks each collection in _id order and checkpoints its progress in the
+`migrations` collection, so an interrupted run resumes where it stopped. A finished field
+is scanned again on the next run, workers still on TIMESTAMP_STORAGE=iso keep writing strings
+until they are switched over.
+
+While it runs, a field holds both dates and strings. Cursor paging of GET /api/contact
+reaches both, but the created_from/created_to filters and the analytics rollups only see
+rows already converted, so finish the migration before relying on them.
+"""
+import argparse
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict
+
+from pymongo import UpdateOne
+
+
+logger = logging.getLogger(__name__)
+
+MIGRATION_ID = "timestamps_to_datetime"
+
+# (collection, field) pairs holding timestamps
+TIMESTAMP_FIELDS = [
+    ("contact_messages", "created_at"),
+    ("contact_messages", "status_changed_at"),
+    ("contact_messages", "responded_at"),
+    ("status_checks", "timestamp"),
+]
+
+
+def parse_timestamp(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+async def migrate_field(db, collection: str, field: str, batch_size: int = 1000) -> int:
+    """Convert string timestamps in one field in batches, returns the number of rows updated"""
+    checkpoint_id = f"{MIGRATION_ID}:{collection}.{field}"
+    checkpoint = await db.migrations.find_one({"_id": checkpoint_id})
+    # Resume an interrupted run, after a finished one start over to catch rows written since
+    if checkpoint and not checkpoint.get("done"):
+        last_id = checkpoint.get("last_id")
+        updated = checkpoint.get("updated", 0)
+    else:
+        last_id = None
+        updated = 0
+    while True:
+        query = {field: {"$type": "string"}}
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        batch = await db[collection].find(query, {"_id": 1, field: 1}).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not batch:
+            break
+
+        requests = []
+        for doc in batch:
+            try:
+                converted = parse_timestamp(doc[field])
+            except ValueError:
+                logger.warning(f"Skipping {collection} {doc['_id']}: unparseable {field} {doc[field]!r}")
+                continue
+            # Match on the old value so concurrent writers are never overwritten
+            requests.append(UpdateOne({"_id": doc["_id"], field: doc[field]}, {"$set": {field: converted}}))
+
+        if requests:
+            result = await db[collection].bulk_write(requests, ordered=False)
+            updated += result.modified_count
+
+        last_id = batch[-1]["_id"]
+        await db.migrations.update_one(
+            {"_id": checkpoint_id},
+            {"$set": {"last_id": last_id, "updated": updated, "done": False}},
+            upsert=True,
+        )
+        logger.info(f"Migrated {updated} {collection}.{field} timestamps so far")
+
+    await db.migrations.update_one(
+        {"_id": checkpoint_id},
+        {"$set": {"done": True, "updated": updated, "finished_at": datetime.now(timezone.utc)}},
+        upsert=True,
+    )
+    return updated
+
+
+async def migrate_timestamps(db, batch_size: int = 1000) -> Dict[str, int]:
+    results = {}
+    for collection, field in TIMESTAMP_FIELDS:
+        results[f"{collection}.{field}"] = await migrate_field(db, collection, field, batch_size)
+    return results
+
+
+async def main():
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    parser = argparse.ArgumentParser(description="Convert ISO string timestamps to BSON datetimes")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'], tz_aware=True)
+    try:
+        results = await migrate_timestamps(client[os.environ['DB_NAME']], args.batch_size)
+        for name, count in results.items():
+            print(f"{name}: {count} converted")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    asyncio.run(main())
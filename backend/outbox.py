@@ -0,0 +1,239 @@
+import asyncio
+import logging
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from pymongo import ReturnDocument
+
+from email_transport import CircuitOpenError, PermanentDeliveryError
+from logs import current_request_id, request_context
+from metrics import email_circuit_open, email_send_duration_seconds, email_send_total
+
+
+logger = logging.getLogger(__name__)
+
+# Outbox record states
+PENDING = "pending"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+
+
+class EmailOutbox:
+    """Durable email queue stored in MongoDB and drained by background workers"""
+
+    def __init__(
+        self,
+        collection,
+        transport,
+        workers: int = 2,
+        max_attempts: int = 5,
+        backoff_base: float = 2.0,
+        backoff_max: float = 300.0,
+        lease_seconds: float = 60.0,
+        poll_interval: float = 5.0,
+        retention_days: float = 30.0,
+        sweep_interval: float = 60.0,
+    ):
+        self.collection = collection
+        self.transport = transport
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        # Sent and failed records are deleted by a TTL index this long after they finished
+        self.retention_days = retention_days
+        self.sweep_interval = sweep_interval
+        # Periodic jobs that queue emails their writers could not, e.g. after a crash
+        self.sweepers: List[Callable[[], Awaitable[int]]] = []
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+        self._stopping = False
+
+    def build_record(self, params: Dict[str, Any], kind: str, ref: Optional[str] = None) -> Dict[str, Any]:
+        now = datetime.now(timezone.utc)
+        return {
+            "id": str(uuid.uuid4()),
+            "kind": kind,
+            "ref": ref,
+            # The request that queued the email, its delivery logs carry the same id
+            "request_id": current_request_id(),
+            "params": params,
+            "status": PENDING,
+            "attempts": 0,
+            "last_error": None,
+            "provider_id": None,
+            "created_at": now,
+            "next_attempt_at": now,
+            "locked_until": None,
+        }
+
+    async def enqueue(self, params: Dict[str, Any], kind: str = "contact_notification", ref: Optional[str] = None) -> str:
+        """Store a pending email and wake up an idle worker"""
+        record = self.build_record(params, kind, ref)
+        await self.collection.insert_one(record)
+        self._wakeup.set()
+        return record["id"]
+
+    async def claim(self) -> Optional[Dict[str, Any]]:
+        """Atomically lease the next due record (or one whose lease has expired)"""
+        now = datetime.now(timezone.utc)
+        return await self.collection.find_one_and_update(
+            {"$or": [
+                {"status": PENDING, "next_attempt_at": {"$lte": now}},
+                {"status": SENDING, "locked_until": {"$lt": now}},
+            ]},
+            {
+                "$set": {"status": SENDING, "locked_until": now + timedelta(seconds=self.lease_seconds)},
+                "$inc": {"attempts": 1},
+            },
+            sort=[("next_attempt_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    def _finished(self, now: datetime) -> Dict[str, Any]:
+        if self.retention_days <= 0:
+            return {}
+        return {"expires_at": now + timedelta(days=self.retention_days)}
+
+    def backoff(self, attempts: int) -> float:
+        return min(self.backoff_base * (2 ** (attempts - 1)), self.backoff_max)
+
+    async def deliver(self, record: Dict[str, Any]) -> bool:
+        """Send one claimed record and record the outcome"""
+        with request_context(record.get("request_id")):
+            return await self._deliver(record)
+
+    async def _deliver(self, record: Dict[str, Any]) -> bool:
+        now = datetime.now(timezone.utc)
+        kind = record.get("kind", "")
+        start = time.perf_counter()
+        try:
+            provider_id = await self.transport.send(record["params"])
+        except CircuitOpenError as e:
+            # The provider is known to be down, wait for the breaker without spending an attempt
+            email_send_total.inc(kind=kind, result="circuit_open")
+            await self.collection.update_one({"id": record["id"]}, {
+                "$set": {"status": PENDING, "locked_until": None, "next_attempt_at": now + timedelta(seconds=e.retry_after)},
+                "$inc": {"attempts": -1},
+            })
+            return False
+        except Exception as e:
+            email_send_duration_seconds.observe(time.perf_counter() - start, kind=kind, result="failure")
+            email_send_total.inc(kind=kind, result="failure")
+            if record["attempts"] >= self.max_attempts or isinstance(e, PermanentDeliveryError):
+                update = {"status": FAILED, "last_error": str(e), "locked_until": None, **self._finished(now)}
+                logger.error(f"Outbox record {record['id']} failed permanently after {record['attempts']} attempts: {str(e)}")
+            else:
+                delay = self.backoff(record["attempts"])
+                update = {
+                    "status": PENDING,
+                    "last_error": str(e),
+                    "locked_until": None,
+                    "next_attempt_at": now + timedelta(seconds=delay),
+                }
+                logger.warning(f"Outbox record {record['id']} attempt {record['attempts']} failed, retrying in {delay:.0f}s: {str(e)}")
+            await self.collection.update_one({"id": record["id"]}, {"$set": update})
+            return False
+
+        email_send_duration_seconds.observe(time.perf_counter() - start, kind=kind, result="success")
+        email_send_total.inc(kind=kind, result="success")
+        await self.collection.update_one(
+            {"id": record["id"]},
+            {"$set": {"status": SENT, "provider_id": provider_id, "sent_at": now, "locked_until": None,
+                      **self._finished(now)}},
+        )
+        logger.info(f"Outbox record {record['id']} delivered. Provider ID: {provider_id}")
+        return True
+
+    def _report_breaker(self):
+        breaker = getattr(self.transport, "breaker", None)
+        if breaker is not None:
+            email_circuit_open.set(0 if breaker.state == "closed" else 1)
+
+    async def drain(self) -> int:
+        """Deliver every record that is currently due, returns the number processed"""
+        processed = 0
+        while True:
+            record = await self.claim()
+            if record is None:
+                return processed
+            await self.deliver(record)
+            processed += 1
+
+    async def _worker(self):
+        # Consecutive database errors, the worker backs off instead of exiting
+        errors = 0
+        while not self._stopping:
+            try:
+                record = await self.claim()
+                if record is not None:
+                    await self.deliver(record)
+                    self._report_breaker()
+                errors = 0
+            except Exception as e:
+                # A record whose outcome could not be stored is claimed again once its lease expires
+                errors += 1
+                delay = min(self.backoff(errors), self.poll_interval * 6)
+                logger.error(f"Outbox worker error, retrying in {delay:.0f}s: {str(e)}")
+                await asyncio.sleep(delay)
+                continue
+            if record is not None:
+                continue
+
+            # Nothing due, sleep until the next enqueue or poll tick
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def expire_finished(self) -> int:
+        """Give finished records written before retention was configured an expiry"""
+        if self.retention_days <= 0:
+            return 0
+        result = await self.collection.update_many(
+            {"status": {"$in": [SENT, FAILED]}, "expires_at": {"$exists": False}},
+            {"$set": self._finished(datetime.now(timezone.utc))},
+        )
+        return result.modified_count
+
+    async def sweep(self) -> int:
+        """Run the registered sweepers once, returns the number of emails they queued"""
+        queued = 0
+        for sweeper in self.sweepers:
+            queued += await sweeper()
+        await self.expire_finished()
+        return queued
+
+    async def _sweeper(self):
+        while not self._stopping:
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.error(f"Outbox sweep failed: {str(e)}")
+            await asyncio.sleep(self.sweep_interval)
+
+    def start(self):
+        self._stopping = False
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        if self.sweep_interval > 0:
+            self._tasks.append(asyncio.create_task(self._sweeper()))
+
+    async def stop(self):
+        self._stopping = True
+        self._wakeup.set()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def stats(self) -> Dict[str, int]:
+        counts = {PENDING: 0, SENDING: 0, SENT: 0, FAILED: 0}
+        async for row in self.collection.aggregate([{"$group": {"_id": "$status", "count": {"$sum": 1}}}]):
+            counts[row["_id"]] = row["count"]
+        return counts
@@ -0,0 +1,52 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(sort_value: Any, doc_id: str) -> str:
+    """Encode the (sort key, id) of the last row on a page into an opaque token"""
+    # Tag datetimes so they decode back to BSON dates rather than strings
+    if isinstance(sort_value, datetime):
+        sort_value = {"$date": sort_value.isoformat()}
+    payload = json.dumps([sort_value, doc_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, str]:
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        sort_value, doc_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if isinstance(sort_value, dict):
+            sort_value = datetime.fromisoformat(sort_value["$date"])
+    except Exception:
+        raise InvalidCursor("Neplatný kurzor stránkovania")
+    if not isinstance(doc_id, str):
+        raise InvalidCursor("Neplatný kurzor stránkovania")
+    return sort_value, doc_id
+
+
+def keyset_filter(field: str, sort_value: Any, doc_id: str) -> Dict[str, Any]:
+    """Rows strictly after the cursor when sorting by (field, id) descending"""
+    after = [
+        {field: {"$lt": sort_value}},
+        {field: sort_value, "id": {"$lt": doc_id}},
+    ]
+    if isinstance(sort_value, datetime):
+        # $lt only compares values of the same type. Until the timestamp migration has finished,
+        # rows still holding ISO strings sort after every date in descending BSON order.
+        after.append({field: {"$type": "string"}})
+    return {"$or": after}
+
+
+def merge_filters(*filters: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    parts = [f for f in filters if f]
+    if not parts:
+        return {}
+    if len(parts) == 1:
+        return parts[0]
+    return {"$and": parts}
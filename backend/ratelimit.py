@@ -0,0 +1,186 @@
+import json
+import math
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from pymongo import ReturnDocument
+
+
+_RATE_PATTERN = re.compile(r"^\s*(\d+)\s*/\s*(\d*)\s*(second|minute|hour|day)s?\s*$")
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+RATE_LIMITED_MESSAGE = "Príliš veľa požiadaviek. Skúste to prosím o chvíľu."
+
+
+class Rate(NamedTuple):
+    capacity: float  # Burst size
+    refill_per_second: float
+
+
+def parse_rate(value: str) -> Optional[Rate]:
+    """Parse "5/minute", "100/10minutes" or "off" into a token bucket rate"""
+    if not value or value.strip().lower() in ("off", "none", "0"):
+        return None
+    match = _RATE_PATTERN.match(value.lower())
+    if not match:
+        raise ValueError(f"Invalid rate limit: {value!r}")
+    count, multiplier, unit = match.groups()
+    period = _PERIODS[unit] * int(multiplier or 1)
+    return Rate(float(count), int(count) / period)
+
+
+class MemoryBucketStore:
+    """Token buckets held in this process, bounded by evicting the least recently used keys"""
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def take(self, key: str, rate: Rate) -> Tuple[bool, float]:
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (rate.capacity, now))
+        tokens = min(rate.capacity, tokens + (now - updated) * rate.refill_per_second)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return allowed, tokens
+
+
+class MongoBucketStore:
+    """Token buckets shared by every worker, updated atomically with a pipeline update"""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def take(self, key: str, rate: Rate) -> Tuple[bool, float]:
+        now = datetime.now(timezone.utc)
+        # Idle buckets are full again after capacity / refill seconds, the TTL index drops them then
+        expires_at = now + timedelta(seconds=rate.capacity / rate.refill_per_second)
+        refilled = {"$min": [rate.capacity, {"$add": [
+            {"$ifNull": ["$tokens", rate.capacity]},
+            {"$multiply": [
+                {"$divide": [{"$subtract": [now, {"$ifNull": ["$updated_at", now]}]}, 1000]},
+                rate.refill_per_second,
+            ]},
+        ]}]}
+        doc = await self.collection.find_one_and_update(
+            {"_id": key},
+            [
+                {"$set": {"tokens": refilled, "updated_at": now, "expires_at": expires_at}},
+                {"$set": {
+                    "allowed": {"$gte": ["$tokens", 1]},
+                    "tokens": {"$cond": [{"$gte": ["$tokens", 1]}, {"$subtract": ["$tokens", 1]}, "$tokens"]},
+                }},
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return doc["allowed"], doc["tokens"]
+
+
+class RateLimiter:
+    def __init__(self, store, enabled: bool = True):
+        self.store = store
+        self.enabled = enabled
+
+    async def hit(self, key: str, rate: Optional[Rate]) -> float:
+        """Take one token, returns 0 when allowed or the seconds to wait before retrying"""
+        if not self.enabled or rate is None:
+            return 0.0
+        allowed, tokens = await self.store.take(key, rate)
+        if allowed:
+            return 0.0
+        return (1 - tokens) / rate.refill_per_second
+
+
+class ConcurrencyLimiter:
+    """Non-blocking cap on requests in progress, excess requests are shed instead of queued"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+
+    def try_acquire(self) -> bool:
+        if self.limit <= 0:
+            return True
+        if self.active >= self.limit:
+            return False
+        self.active += 1
+        return True
+
+    def release(self):
+        if self.limit > 0:
+            self.active -= 1
+
+
+def client_ip(scope, trusted_proxy_hops: int = 0) -> str:
+    """Client address, taken from X-Forwarded-For when running behind trusted proxies"""
+    if trusted_proxy_hops > 0:
+        for name, value in scope.get("headers", []):
+            if name == b"x-forwarded-for":
+                hops = [hop.strip() for hop in value.decode("latin-1").split(",") if hop.strip()]
+                if hops:
+                    return hops[-min(trusted_proxy_hops, len(hops))]
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+def too_many_requests(retry_after: float) -> Tuple[Dict[str, str], bytes]:
+    headers = {"Retry-After": str(max(1, math.ceil(retry_after)))}
+    body = json.dumps({"detail": {"success": False, "message": RATE_LIMITED_MESSAGE}}, ensure_ascii=False)
+    return headers, body.encode()
+
+
+class AdmissionControlMiddleware:
+    """Sheds POST traffic with 429 before the body is parsed: global concurrency cap, then per-IP buckets"""
+
+    def __init__(self, app, limiter: RateLimiter, concurrency: ConcurrencyLimiter,
+                 routes: Dict[str, Optional[Rate]], trusted_proxy_hops: int = 0, on_reject=None):
+        self.app = app
+        self.limiter = limiter
+        self.concurrency = concurrency
+        # path -> per-IP rate for POST requests to that path
+        self.routes = routes
+        self.trusted_proxy_hops = trusted_proxy_hops
+        self.on_reject = on_reject
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.routes:
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+        if not self.concurrency.try_acquire():
+            await self._reject(send, path, "concurrency", 1.0)
+            return
+        try:
+            ip = client_ip(scope, self.trusted_proxy_hops)
+            retry_after = await self.limiter.hit(f"ip:{path}:{ip}", self.routes[path])
+            if retry_after:
+                await self._reject(send, path, "ip", retry_after)
+                return
+            await self.app(scope, receive, send)
+        finally:
+            self.concurrency.release()
+
+    async def _reject(self, send, path: str, reason: str, retry_after: float):
+        if self.on_reject is not None:
+            self.on_reject(path, reason)
+        headers, body = too_many_requests(retry_after)
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                *[(name.lower().encode(), value.encode()) for name, value in headers.items()],
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,273 @@
+"""
+Retention for the hot collections.
+
+Status checks carry an expires_at timestamp and are removed by the TTL index on it. Contact
+messages that were answered long ago are moved in batches into a compressed archive, either
+the contact_messages_archive collection or NDJSON.gz files.
+
+The app runs the job in the background; to run it once from the backend directory:
+    python retention.py [--batch-size 500]
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, CollectionInvalid
+
+from export import json_default
+from jobs import PeriodicJob, acquire_lease, release_lease
+from migrations import parse_timestamp
+
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_COLLECTION = "contact_messages_archive"
+
+# Only messages in this state leave the hot collection
+ARCHIVED_STATUS = "responded"
+
+
+def status_check_expiry(timestamp: datetime, ttl_days: float) -> Optional[datetime]:
+    """expires_at for a new status check, None keeps it forever"""
+    if ttl_days <= 0:
+        return None
+    return timestamp + timedelta(days=ttl_days)
+
+
+class CollectionArchive:
+    """Archive collection stored with the zstd block compressor"""
+
+    def __init__(self, db, name: str = ARCHIVE_COLLECTION):
+        self.db = db
+        self.collection = db[name]
+
+    async def prepare(self):
+        try:
+            # Compression is a creation-time option, an existing collection keeps its own
+            await self.db.create_collection(
+                self.collection.name,
+                storageEngine={"wiredTiger": {"configString": "block_compressor=zstd"}},
+            )
+        except CollectionInvalid:
+            pass
+
+    async def write(self, docs: List[Dict[str, Any]]):
+        try:
+            await self.collection.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            # Rows copied by an interrupted run are already archived, anything else is an error
+            if any(err.get("code") != 11000 for err in e.details.get("writeErrors", [])):
+                raise
+
+    async def discard(self, ids: List[str]):
+        await self.collection.delete_many({"id": {"$in": ids}})
+
+    async def close(self):
+        pass
+
+
+class NdjsonArchive:
+    """One gzip compressed NDJSON file per run, every batch is flushed to disk before it is deleted"""
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.path: Optional[Path] = None
+        self._file = None
+
+    async def prepare(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')
+        self.path = self.directory / f"contact_messages_{stamp}.ndjson.gz"
+
+    def _write(self, docs: List[Dict[str, Any]]):
+        if self._file is None:
+            self._file = open(self.path, "ab")
+        # Each batch is its own gzip member, concatenated members decompress as one stream
+        lines = "".join(json.dumps(doc, ensure_ascii=False, default=json_default) + "\n" for doc in docs)
+        self._file.write(gzip.compress(lines.encode()))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    async def write(self, docs: List[Dict[str, Any]]):
+        await asyncio.to_thread(self._write, docs)
+
+    async def discard(self, ids: List[str]):
+        # Rows whose status changed mid-batch stay in the file, the hot collection is authoritative
+        logger.warning(f"{len(ids)} archived rows changed before deletion and were kept in {self.path}")
+
+    async def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class RetentionJob(PeriodicJob):
+    """Scheduled archival of old responded messages and expiry backfill of status checks"""
+
+    name = "Retention run"
+
+    def __init__(
+        self,
+        db,
+        archive,
+        archive_after_days: float = 180.0,
+        status_ttl_days: float = 30.0,
+        batch_size: int = 500,
+        max_batches: int = 100,
+        interval: float = 3600.0,
+        lease_seconds: float = 1800.0,
+    ):
+        super().__init__(interval)
+        self.db = db
+        self.archive = archive
+        self.archive_after_days = archive_after_days
+        self.status_ttl_days = status_ttl_days
+        self.batch_size = batch_size
+        # Bounds the work of one run, the rest is picked up by the next one
+        self.max_batches = max_batches
+        self.lease_seconds = lease_seconds
+
+    async def archive_contacts(self, now: datetime) -> int:
+        """Move responded messages created before the cutoff, in created_at order"""
+        if self.archive_after_days <= 0:
+            return 0
+        cutoff = now - timedelta(days=self.archive_after_days)
+        # Served by the status_created_at_id index
+        query = {"status": ARCHIVED_STATUS, "created_at": {"$lt": cutoff}}
+        await self.archive.prepare()
+        moved = 0
+        try:
+            for _ in range(self.max_batches):
+                batch = await self.db.contact_messages.find(query).sort(
+                    [("created_at", 1), ("id", 1)]
+                ).limit(self.batch_size).to_list(self.batch_size)
+                if not batch:
+                    break
+
+                for doc in batch:
+                    doc.pop("_id", None)
+                    doc["archived_at"] = now
+                await self.archive.write(batch)
+
+                ids = [doc["id"] for doc in batch]
+                # Re-check the status so a message reopened meanwhile stays in the hot collection
+                result = await self.db.contact_messages.delete_many({**query, "id": {"$in": ids}})
+                moved += result.deleted_count
+                if result.deleted_count < len(ids):
+                    kept = await self.db.contact_messages.distinct("id", {"id": {"$in": ids}})
+                    await self.archive.discard(kept)
+                if len(batch) < self.batch_size:
+                    break
+        finally:
+            await self.archive.close()
+        return moved
+
+    async def backfill_status_expiry(self) -> int:
+        """Give status checks written without expires_at one, so the TTL index removes them"""
+        if self.status_ttl_days <= 0:
+            return 0
+        updated = 0
+        for _ in range(self.max_batches):
+            batch = await self.db.status_checks.find(
+                {"expires_at": None}, {"_id": 1, "timestamp": 1}
+            ).limit(self.batch_size).to_list(self.batch_size)
+            if not batch:
+                break
+            requests = []
+            for doc in batch:
+                timestamp = doc.get("timestamp")
+                if isinstance(timestamp, str):
+                    try:
+                        timestamp = parse_timestamp(timestamp)
+                    except ValueError:
+                        logger.warning(f"Status check {doc['_id']} has an unparseable timestamp {timestamp!r}")
+                if not isinstance(timestamp, datetime):
+                    # Without a usable timestamp there is nothing to age the row by, expire it from now.
+                    # It also leaves the {"expires_at": None} batches, so the next one moves on.
+                    timestamp = datetime.now(timezone.utc)
+                requests.append(UpdateOne(
+                    {"_id": doc["_id"]},
+                    {"$set": {"expires_at": status_check_expiry(timestamp, self.status_ttl_days)}},
+                ))
+            result = await self.db.status_checks.bulk_write(requests, ordered=False)
+            updated += result.modified_count
+            if len(batch) < self.batch_size:
+                break
+        return updated
+
+    async def run(self) -> Optional[Dict[str, Any]]:
+        """One retention pass, returns None when another worker is running it"""
+        now = datetime.now(timezone.utc)
+        # Leased, so several workers never archive the same rows at once
+        if await acquire_lease(self.db.retention_runs, "retention", now, self.lease_seconds) is None:
+            return None
+        try:
+            summary = {
+                "started_at": now,
+                "archived_contacts": await self.archive_contacts(now),
+                "status_checks_backfilled": await self.backfill_status_expiry(),
+                "finished_at": datetime.now(timezone.utc),
+            }
+        finally:
+            await release_lease(self.db.retention_runs, "retention")
+        await self.db.retention_runs.update_one({"_id": "retention"}, {"$set": {"last_run": summary}})
+        return summary
+
+    async def last_run(self) -> Optional[Dict[str, Any]]:
+        state = await self.db.retention_runs.find_one({"_id": "retention"}, {"_id": 0, "last_run": 1})
+        return (state or {}).get("last_run")
+
+    async def tick(self):
+        summary = await self.run()
+        if summary and (summary["archived_contacts"] or summary["status_checks_backfilled"]):
+            logger.info(
+                f"Retention archived {summary['archived_contacts']} contact messages, "
+                f"set expiry on {summary['status_checks_backfilled']} status checks"
+            )
+
+
+def create_archive(db, target: str, directory: Path):
+    """Archive sink for RETENTION_ARCHIVE: collection (default) or ndjson"""
+    if target == "ndjson":
+        return NdjsonArchive(directory)
+    return CollectionArchive(db)
+
+
+async def main():
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    parser = argparse.ArgumentParser(description="Archive old contact messages and expire old status checks")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    backend_dir = Path(__file__).parent
+    load_dotenv(backend_dir / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'], tz_aware=True)
+    try:
+        db = client[os.environ['DB_NAME']]
+        job = RetentionJob(
+            db,
+            create_archive(db, os.environ.get('RETENTION_ARCHIVE', 'collection'),
+                           Path(os.environ.get('RETENTION_ARCHIVE_DIR', backend_dir / 'archive'))),
+            archive_after_days=float(os.environ.get('CONTACT_ARCHIVE_AFTER_DAYS', '180')),
+            status_ttl_days=float(os.environ.get('STATUS_CHECK_TTL_DAYS', '30')),
+            batch_size=args.batch_size,
+            max_batches=1_000_000,
+        )
+        summary = await job.run()
+        print(summary if summary is not None else "Another retention run holds the lease")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    asyncio.run(main())
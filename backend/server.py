@@ -1,36 +1,286 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+from fastapi import FastAPI, APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from contextlib import asynccontextmanager
+import asyncio
 import os
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict, EmailStr, field_validator
-from typing import List, Optional
+from pydantic import BaseModel, Field, ConfigDict, EmailStr, TypeAdapter, ValidationError, field_validator
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from typing import Any, List, Literal, Optional
 import uuid
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 import re
-import resend
+import math
+from outbox import EmailOutbox
+from feed import ContactFeed
+from analytics import SERIES_LENGTH, AnalyticsRollups
+from retention import RetentionJob, create_archive, status_check_expiry
+from cache import ResponseCache, ResponseCompressor, cached_json_response
+import database
+from dedup import SubmissionDeduplicator, submission_fingerprint
+from email_templates import EmailTemplates
+from email_transport import CircuitBreaker, FakeTransport, ReliableTransport, ResendTransport, SmtpTransport
+from export import CONTACT_EXPORT_FIELDS, export_projection, stream_csv, stream_ndjson
+import metrics
+from serialization import RowSerializer
+from idempotency import REPLAYED_HEADER, IdempotencyMiddleware, IdempotencyStore
+from indexes import ensure_indexes, index_report
+from ratelimit import (
+    AdmissionControlMiddleware, ConcurrencyLimiter, MemoryBucketStore, MongoBucketStore,
+    RATE_LIMITED_MESSAGE, RateLimiter, parse_rate,
+)
+from pagination import InvalidCursor, decode_cursor, encode_cursor, keyset_filter, merge_filters
+from logs import MongoCommandTracing, RequestContextMiddleware, current_request_id, parse_sample_rates, setup_logging
 
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+# Logging - records are queued and written by a background thread, so the event loop never
+# blocks on log output. Sampling keeps a fraction of the INFO records of busy loggers.
+setup_logging(
+    level=os.environ.get('LOG_LEVEL', 'INFO'),
+    fmt=os.environ.get('LOG_FORMAT', 'json'),  # json, text
+    sample_rates=parse_sample_rates(os.environ.get('LOG_SAMPLE_RATES', 'uvicorn.access=0.1')),
+)
+logger = logging.getLogger(__name__)
+LOG_SLOW_REQUEST_SECONDS = float(os.environ.get('LOG_SLOW_REQUEST_MS', '1000')) / 1000  # 0 disables
+LOG_SLOW_MONGO_SECONDS = float(os.environ.get('LOG_SLOW_MONGO_MS', '500')) / 1000  # 0 disables
+# Send the request id as the comment of handler queries, shown by the profiler, currentOp and mongod's slow query log
+MONGO_REQUEST_COMMENTS = os.environ.get('MONGO_REQUEST_COMMENTS', 'true').lower() == 'true'
+
+def request_comment() -> dict:
+    """comment= keyword for a driver call made while handling a request"""
+    request_id = current_request_id() if MONGO_REQUEST_COMMENTS else None
+    return {"comment": request_id} if request_id else {}
+
+# MongoDB handles and the services holding collections or connection pools are created in the
+# lifespan (connect_services), so importing the app opens no sockets
+client = None
+db = None
+read_db = None
+email_transport = None
+outbox = None
+deduplicator = None
+analytics = None
+retention = None
+feed = None
+
+# Timestamp storage - native BSON datetimes, or legacy ISO strings
+TIMESTAMP_STORAGE = os.environ.get('TIMESTAMP_STORAGE', 'datetime')  # datetime, iso
 
-# Resend Email Configuration
+def to_db_time(value: datetime):
+    """Convert a datetime to the representation timestamps are stored with in MongoDB"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    value = value.astimezone(timezone.utc)
+    return value.isoformat() if TIMESTAMP_STORAGE == 'iso' else value
+
+# Email Configuration
 RESEND_API_KEY = os.environ.get('RESEND_API_KEY', '')
 SENDER_EMAIL = os.environ.get('SMTP_FROM_EMAIL', 'info@fenjislovakia.eu')
 RECIPIENT_EMAIL = os.environ.get('SMTP_TO_EMAIL', 'info@fenjislovakia.eu')
+EMAIL_SENDER = os.environ.get('EMAIL_SENDER', 'resend')  # resend, smtp, fake
+
+def create_email_transport():
+    """Build the configured email transport, wrapped with a send timeout and a circuit breaker"""
+    if EMAIL_SENDER == 'fake':
+        transport = FakeTransport()
+    elif EMAIL_SENDER == 'smtp':
+        transport = SmtpTransport(
+            hostname=os.environ.get('SMTP_HOST', 'localhost'),
+            port=int(os.environ.get('SMTP_PORT', '587')),
+            username=os.environ.get('SMTP_USERNAME'),
+            password=os.environ.get('SMTP_PASSWORD'),
+            use_tls=os.environ.get('SMTP_USE_TLS', 'false').lower() == 'true',
+            start_tls=os.environ.get('SMTP_STARTTLS', 'true').lower() == 'true',
+            pool_size=int(os.environ.get('SMTP_POOL_SIZE', '2')),
+        )
+    else:
+        transport = ResendTransport(RESEND_API_KEY, max_connections=int(os.environ.get('RESEND_MAX_CONNECTIONS', '10')))
+    return ReliableTransport(
+        transport,
+        timeout=float(os.environ.get('EMAIL_SEND_TIMEOUT', '15')),
+        breaker=CircuitBreaker(
+            failure_threshold=int(os.environ.get('EMAIL_BREAKER_FAILURES', '5')),
+            reset_timeout=float(os.environ.get('EMAIL_BREAKER_RESET', '60')),
+        ),
+    )
+
+# Email templates, compiled at startup
+EMAIL_LOCALE = os.environ.get('EMAIL_LOCALE', 'sk')
+email_templates = EmailTemplates(ROOT_DIR / 'templates' / 'email', default_locale='sk')
+
+# Cache for serialized GET responses, invalidated by the matching writes (per worker process)
+response_cache = ResponseCache(
+    max_entries=int(os.environ.get('RESPONSE_CACHE_SIZE', '256')),
+    ttl=float(os.environ.get('RESPONSE_CACHE_TTL', '5')),
+)
+
+# Compression of the list responses, negotiated through Accept-Encoding
+response_compressor = ResponseCompressor(
+    min_size=int(os.environ.get('RESPONSE_COMPRESS_MIN_SIZE', '1024')),  # 0 disables compression
+    gzip_level=int(os.environ.get('RESPONSE_GZIP_LEVEL', '6')),
+    brotli_quality=int(os.environ.get('RESPONSE_BROTLI_QUALITY', '5')),
+)
+
+# List responses: "fast" encodes trusted rows with orjson, "validated" runs them through the models
+RESPONSE_SERIALIZATION = os.environ.get('RESPONSE_SERIALIZATION', 'fast')  # fast, validated
+
+# Rate limiting and admission control for the POST endpoints
+# Rates look like "10/minute" or "100/10minutes", "off" disables a limit
+RATE_LIMITS = {
+    "/api/contact": parse_rate(os.environ.get('RATE_LIMIT_CONTACT_IP', '10/minute')),
+    "/api/status": parse_rate(os.environ.get('RATE_LIMIT_STATUS_IP', '120/minute')),
+    # Up to 5000 rows per request, so only a few requests per client
+    "/api/contact/bulk": parse_rate(os.environ.get('RATE_LIMIT_BULK_IP', '5/hour')),
+}
+# Per-IP limits need the real client address. Behind the ingress every request comes from the
+# proxy, so the address is taken from X-Forwarded-For, this many hops from the right. With 0 all
+# visitors share one bucket; when the app is exposed directly set 0, or clients can spoof the header.
+TRUSTED_PROXY_HOPS = int(os.environ.get('TRUSTED_PROXY_HOPS', '1'))
+RATE_LIMIT_CONTACT_EMAIL = parse_rate(os.environ.get('RATE_LIMIT_CONTACT_EMAIL', '5/hour'))
+RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'memory')  # memory, mongo (shared by all workers)
+# The shared Mongo store replaces the in-process one once the database is connected
+rate_limiter = RateLimiter(
+    MemoryBucketStore(),
+    enabled=os.environ.get('RATE_LIMIT_ENABLED', 'true').lower() == 'true',
+)
+post_concurrency = ConcurrencyLimiter(int(os.environ.get('MAX_CONCURRENT_POSTS', '64')))
+
+# Idempotency-Key support for the POST endpoints - a retried request gets the first response back
+idempotency_store = IdempotencyStore(
+    ttl_seconds=float(os.environ.get('IDEMPOTENCY_TTL_SECONDS', '86400')),  # 0 ignores the header
+    max_entries=int(os.environ.get('IDEMPOTENCY_CACHE_SIZE', '10000')),
+)
+
+# Retention - status checks expire through a TTL index, old responded messages are archived
+STATUS_CHECK_TTL_DAYS = float(os.environ.get('STATUS_CHECK_TTL_DAYS', '30'))  # 0 keeps them forever
+
+def connect_services():
+    """Create the MongoDB client and every service that holds a collection or a connection pool"""
+    global client, db, read_db, email_transport, outbox, deduplicator, analytics, retention, feed
+    # The driver is only needed once the app is served, not when it is imported
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(
+        os.environ['MONGO_URL'], tz_aware=True,
+        event_listeners=[metrics.MongoCommandMetrics(), MongoCommandTracing(LOG_SLOW_MONGO_SECONDS)],
+        **database.client_options()
+    )
+    db = client[os.environ['DB_NAME']]
+    # GET endpoints may read from secondaries, writes and read-after-write lookups stay on the primary
+    read_db = client.get_database(os.environ['DB_NAME'], read_preference=database.read_preference_for_reads())
 
-# Initialize Resend
-resend.api_key = RESEND_API_KEY
+    # Email outbox - notifications are queued in MongoDB and delivered by background workers
+    email_transport = create_email_transport()
+    outbox = EmailOutbox(
+        db.email_outbox,
+        email_transport,
+        workers=int(os.environ.get('OUTBOX_WORKERS', '2')),
+        max_attempts=int(os.environ.get('OUTBOX_MAX_ATTEMPTS', '5')),
+        poll_interval=float(os.environ.get('OUTBOX_POLL_INTERVAL', '5')),
+        retention_days=float(os.environ.get('OUTBOX_RETENTION_DAYS', '30')),  # 0 keeps sent and failed records
+        sweep_interval=float(os.environ.get('OUTBOX_SWEEP_INTERVAL', '60')),  # 0 disables the sweeper
+    )
+    outbox.sweepers.append(recover_notifications)
+
+    # Duplicate submission detection - resubmits within the window return the original message
+    deduplicator = SubmissionDeduplicator(
+        db.contact_fingerprints,
+        window_seconds=float(os.environ.get('DEDUP_WINDOW_SECONDS', '600')),
+        max_entries=int(os.environ.get('DEDUP_CACHE_SIZE', '10000')),
+    )
+
+    if RATE_LIMIT_BACKEND == 'mongo':
+        rate_limiter.store = MongoBucketStore(db.rate_limits)
+    idempotency_store.collection = db.idempotency_keys
+
+    retention = RetentionJob(
+        db,
+        create_archive(
+            db,
+            os.environ.get('RETENTION_ARCHIVE', 'collection'),  # collection, ndjson
+            Path(os.environ.get('RETENTION_ARCHIVE_DIR', ROOT_DIR / 'archive')),
+        ),
+        archive_after_days=float(os.environ.get('CONTACT_ARCHIVE_AFTER_DAYS', '180')),  # 0 disables archiving
+        status_ttl_days=STATUS_CHECK_TTL_DAYS,
+        batch_size=int(os.environ.get('RETENTION_BATCH_SIZE', '500')),
+        interval=float(os.environ.get('RETENTION_INTERVAL', '3600')),  # 0 disables the scheduled runs
+    )
+
+    # Time-bucketed analytics, pre-aggregated into rollup collections by a background refresh.
+    # Rollups keep counting archived messages: from the archive collection, or by leaving the
+    # buckets old enough to hold archived rows untouched when the archive is written to files.
+    archive_collection = getattr(retention.archive, 'collection', None)
+    analytics = AnalyticsRollups(
+        db,
+        read_db,
+        tz=os.environ.get('ANALYTICS_TIMEZONE', 'Europe/Bratislava'),
+        interval=float(os.environ.get('ANALYTICS_REFRESH_INTERVAL', '60')),  # 0 disables the background refresh
+        contact_archive=archive_collection.name if archive_collection is not None else None,
+        freeze_after=(
+            timedelta(days=retention.archive_after_days)
+            if archive_collection is None and retention.archive_after_days > 0 else None
+        ),
+    )
+
+    # Live feed of new contact messages - one change stream shared by all connected clients
+    feed = ContactFeed(
+        read_db.contact_messages,
+        contact_list_serializer.dump_row,
+        buffer_size=int(os.environ.get('CONTACT_FEED_BUFFER', '1000')),
+        max_clients=int(os.environ.get('CONTACT_FEED_MAX_CLIENTS', '100')),
+    )
+
+async def warm_up_database():
+    # A cold pool makes the first requests after a deploy slow, open connections up front
+    try:
+        await database.warm_up(client, int(os.environ.get('MONGO_WARMUP_CONNECTIONS', '5')))
+        app.state.db_ready = True
+    except Exception as e:
+        app.state.db_ready = False
+        logger.error(f"MongoDB warm-up failed: {str(e)}")
+
+async def bootstrap_schema():
+    try:
+        # Creating indexes creates the collection, the archive needs its compression options first
+        await retention.archive.prepare()
+    except Exception as e:
+        logger.error(f"Failed to prepare the contact archive: {str(e)}")
+    try:
+        await ensure_indexes(db)
+    except Exception as e:
+        logger.error(f"Failed to ensure MongoDB indexes: {str(e)}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    connect_services()
+    # Template compilation overlaps with the MongoDB round trips of the warm-up
+    _, count = await asyncio.gather(warm_up_database(), asyncio.to_thread(email_templates.load))
+    logger.info(f"Compiled {count} email templates")
+    # The indexes exist on every start but the first, serving does not wait for the check
+    schema_task = asyncio.create_task(bootstrap_schema())
+    outbox.start()
+    analytics.start()
+    retention.start()
+    try:
+        yield
+    finally:
+        schema_task.cancel()
+        await asyncio.gather(schema_task, return_exceptions=True)
+        await feed.stop()
+        await retention.stop()
+        await analytics.stop()
+        await outbox.stop()
+        await email_transport.aclose()
+        client.close()
 
 # Create the main app without a prefix
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -90,6 +340,47 @@ class ContactMessage(BaseModel):
     message: str
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     status: str = Field(default="new")  # new, read, responded
+    status_changed_at: Optional[datetime] = None
+    responded_at: Optional[datetime] = None  # When the message was first marked responded
+    version: int = 0  # Bumped on every status change, used for optimistic concurrency
+
+ContactStatus = Literal["new", "read", "responded"]
+
+# Allowed status transitions, keyed by the target state. A message marked responded by
+# mistake can be reopened, it keeps the responded_at of its first response.
+STATUS_TRANSITIONS_FROM = {
+    "new": ["read", "responded"],
+    "read": ["new", "responded"],
+    "responded": ["new", "read"],
+}
+
+class ContactStatusUpdate(BaseModel):
+    status: ContactStatus
+    expected_version: Optional[int] = None
+
+class ContactStatusBulkUpdate(BaseModel):
+    status: ContactStatus
+    from_status: Optional[ContactStatus] = None
+    ids: Optional[List[str]] = Field(default=None, max_length=10000)
+    created_from: Optional[datetime] = None
+    created_to: Optional[datetime] = None
+    email: Optional[str] = None
+    all: bool = False  # Required to update every message when no other filter is given
+
+class ContactSearchResult(ContactMessage):
+    score: float
+
+class ContactBulkCreate(BaseModel):
+    # Items are validated one by one in the handler so a bad row, even one that is not an
+    # object, doesn't reject the batch
+    messages: List[Any] = Field(..., min_length=1, max_length=5000)
+
+# Validator for a whole batch of contact messages, built once
+contact_batch_adapter = TypeAdapter(List[ContactMessageCreate])
+
+# Serializers for the cached list responses
+status_list_serializer = RowSerializer(StatusCheck, RESPONSE_SERIALIZATION)
+contact_list_serializer = RowSerializer(ContactMessage, RESPONSE_SERIALIZATION)
 
 # Add your routes to the router instead of directly to app
 @api_router.get("/")
@@ -101,128 +392,160 @@ async def create_status_check(input: StatusCheckCreate):
     status_dict = input.model_dump()
     status_obj = StatusCheck(**status_dict)
     
-    # Convert to dict and serialize datetime to ISO string for MongoDB
     doc = status_obj.model_dump()
-    doc['timestamp'] = doc['timestamp'].isoformat()
+    doc['timestamp'] = to_db_time(doc['timestamp'])
+    # The TTL index needs a BSON date, whatever the timestamp storage
+    doc['expires_at'] = status_check_expiry(status_obj.timestamp, STATUS_CHECK_TTL_DAYS)
     
-    _ = await db.status_checks.insert_one(doc)
+    _ = await db.status_checks.insert_one(doc, **request_comment())
+    response_cache.invalidate("status")
     return status_obj
 
 @api_router.get("/status", response_model=List[StatusCheck])
-async def get_status_checks():
-    # Exclude MongoDB's _id field from the query results
-    status_checks = await db.status_checks.find({}, {"_id": 0}).to_list(1000)
-    
-    # Convert ISO string timestamps back to datetime objects
-    for check in status_checks:
-        if isinstance(check['timestamp'], str):
-            check['timestamp'] = datetime.fromisoformat(check['timestamp'])
-    
-    return status_checks
+async def get_status_checks(request: Request):
+    key = response_cache.key("status", request)
+    cached = response_cache.get(key)
+    if cached is None:
+        # Only the model's fields, MongoDB's _id and internal fields stay out
+        status_checks = await read_db.status_checks.find({}, status_list_serializer.projection(), **request_comment()).to_list(1000)
+        body = status_list_serializer.dump(status_checks)
+        cached = response_cache.put(key, body)
+    return cached_json_response(cached, request, response_compressor)
+
+# Email notification for a new contact form submission
+def build_email_notification(contact_data: ContactMessage) -> dict:
+    """Build the Resend params for a new contact form submission"""
+    email = email_templates.render("contact_notification", {"contact": contact_data}, EMAIL_LOCALE)
+    return {
+        "from": f"FENJI Slovakia <{SENDER_EMAIL}>",
+        "to": [RECIPIENT_EMAIL],
+        "subject": email.subject,
+        "html": email.html,
+        "text": email.text,
+    }
+
+def build_digest_notification(contacts: List[ContactMessage]) -> dict:
+    """Build a single digest email for a batch of imported contact messages"""
+    email = email_templates.render(
+        "contact_digest", {"contacts": contacts[:50], "total": len(contacts)}, EMAIL_LOCALE
+    )
+    return {
+        "from": f"FENJI Slovakia <{SENDER_EMAIL}>",
+        "to": [RECIPIENT_EMAIL],
+        "subject": email.subject,
+        "html": email.html,
+        "text": email.text,
+    }
 
-# Email sending function using Resend
-async def send_email_notification(contact_data: ContactMessage):
-    """Send email notification when a new contact form is submitted using Resend"""
+async def queue_contact_notification(contact_obj: ContactMessage):
+    """Queue the notification of a saved message and clear its notification_pending flag"""
     try:
-        # Create HTML email body
-        html_body = f"""
-        <html>
-            <head>
-                <style>
-                    body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-                    .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                    .header {{ background-color: #f8f9fa; padding: 20px; border-radius: 5px; margin-bottom: 20px; }}
-                    .content {{ background-color: #ffffff; padding: 20px; border: 1px solid #e0e0e0; border-radius: 5px; }}
-                    .field {{ margin-bottom: 15px; }}
-                    .label {{ font-weight: bold; color: #555; }}
-                    .value {{ color: #333; margin-top: 5px; }}
-                    .footer {{ margin-top: 20px; padding-top: 20px; border-top: 1px solid #e0e0e0; color: #666; font-size: 12px; }}
-                </style>
-            </head>
-            <body>
-                <div class="container">
-                    <div class="header">
-                        <h2 style="margin: 0; color: #333;">Nová správa z kontaktného formulára</h2>
-                        <p style="margin: 5px 0 0 0; color: #666;">FENJI Slovakia s.r.o.</p>
-                    </div>
-                    
-                    <div class="content">
-                        <div class="field">
-                            <div class="label">Meno:</div>
-                            <div class="value">{contact_data.name}</div>
-                        </div>
-                        
-                        <div class="field">
-                            <div class="label">Email:</div>
-                            <div class="value"><a href="mailto:{contact_data.email}">{contact_data.email}</a></div>
-                        </div>
-                        
-                        <div class="field">
-                            <div class="label">Telefón:</div>
-                            <div class="value">{contact_data.phone if contact_data.phone else 'Neuvedené'}</div>
-                        </div>
-                        
-                        <div class="field">
-                            <div class="label">Správa:</div>
-                            <div class="value" style="white-space: pre-wrap;">{contact_data.message}</div>
-                        </div>
-                        
-                        <div class="footer">
-                            <p>Dátum prijatia: {contact_data.created_at.strftime('%d.%m.%Y %H:%M:%S')}</p>
-                            <p>ID správy: {contact_data.id}</p>
-                        </div>
-                    </div>
-                </div>
-            </body>
-        </html>
-        """
-        
-        # Send email using Resend
-        params = {
-            "from": f"FENJI Slovakia <{SENDER_EMAIL}>",
-            "to": [RECIPIENT_EMAIL],
-            "subject": f"Nová správa z kontaktného formulára - {contact_data.name}",
-            "html": html_body,
-        }
-        
-        email = resend.Emails.send(params)
-        
-        logger.info(f"Email notification sent successfully to {RECIPIENT_EMAIL} via Resend. ID: {email.get('id', 'N/A')}")
-        return True
-        
-    except Exception as e:
-        logger.error(f"Failed to send email notification via Resend: {str(e)}")
-        # Don't fail the entire request if email fails
-        return False
+        await outbox.enqueue(build_email_notification(contact_obj), ref=contact_obj.id)
+    except DuplicateKeyError:
+        pass  # Already queued
+    await db.contact_messages.update_one(
+        {"id": contact_obj.id}, {"$unset": {"notification_pending": ""}}, **request_comment()
+    )
+
+async def recover_notifications() -> int:
+    """Queue the notifications of messages saved without one, e.g. when the process died in between"""
+    # Requests still queueing their own notification are left alone
+    cutoff = to_db_time(datetime.now(timezone.utc) - timedelta(minutes=2))
+    recovered = 0
+    # digest_ref -> whether that bulk import's digest reached the outbox
+    digests = {}
+    async for doc in db.contact_messages.find({"notification_pending": True, "created_at": {"$lt": cutoff}}).limit(100):
+        digest_ref = doc.get("digest_ref")
+        if digest_ref is not None and digest_ref not in digests:
+            digests[digest_ref] = await outbox.collection.find_one(
+                {"kind": "contact_digest", "ref": digest_ref}, {"_id": 1}
+            ) is not None
+        if digests.get(digest_ref):
+            # Covered by the digest, only the flag was left behind
+            await db.contact_messages.update_one({"id": doc["id"]}, {"$unset": {"notification_pending": ""}})
+            continue
+        await queue_contact_notification(ContactMessage(**doc))
+        recovered += 1
+    if recovered:
+        logger.warning(f"Queued {recovered} missing contact notifications")
+    return recovered
+
+def validate_contact_batch(items: List[Any]):
+    """Validate a batch in one pass, returns (valid (index, model) pairs, per-item errors)"""
+    try:
+        return list(enumerate(contact_batch_adapter.validate_python(items))), []
+    except ValidationError as e:
+        failed = {}
+        for err in e.errors():
+            failed.setdefault(err["loc"][0], []).append(
+                {"field": ".".join(str(part) for part in err["loc"][1:]), "message": err["msg"]}
+            )
+    
+    # Only the rows that passed need to be turned into models
+    valid = [
+        (index, ContactMessageCreate.model_validate(item))
+        for index, item in enumerate(items) if index not in failed
+    ]
+    errors = [{"index": index, "errors": errs} for index, errs in sorted(failed.items())]
+    return valid, errors
 
 # Contact Form Endpoints
 @api_router.post("/contact")
 async def create_contact_message(input: ContactMessageCreate):
     try:
         # Create ContactMessage object
+        retry_after = await rate_limiter.hit(f"email:{input.email.lower()}", RATE_LIMIT_CONTACT_EMAIL)
+        if retry_after:
+            metrics.rate_limited_total.inc(route="/api/contact", reason="email")
+            raise HTTPException(status_code=429, headers={"Retry-After": str(max(1, math.ceil(retry_after)))}, detail={
+                "success": False,
+                "message": RATE_LIMITED_MESSAGE
+            })
+        
         contact_dict = input.model_dump()
         contact_obj = ContactMessage(**contact_dict)
         
-        # Convert to dict and serialize datetime to ISO string for MongoDB
+        # Resubmitted forms and bot floods are answered with the original message id
+        fingerprint = submission_fingerprint(contact_obj.name, contact_obj.email, contact_obj.message)
+        original_id = await deduplicator.claim(fingerprint, contact_obj.id)
+        if original_id is not None:
+            metrics.contact_duplicates_total.inc()
+            logger.info(f"Duplicate contact message ignored, original ID: {original_id}")
+            return {
+                "success": True,
+                "message": "Vaša správa bola úspešne odoslaná. Ozveme sa vám čoskoro!",
+                "id": original_id
+            }
+        
         doc = contact_obj.model_dump()
-        doc['created_at'] = doc['created_at'].isoformat()
+        doc['created_at'] = to_db_time(doc['created_at'])
+        # Written with the message, cleared once the email is in the outbox. The outbox sweeper
+        # queues it for messages whose request failed in between.
+        doc['notification_pending'] = True
         
         # Insert into MongoDB
-        result = await db.contact_messages.insert_one(doc)
+        try:
+            result = await db.contact_messages.insert_one(doc, **request_comment())
+        except Exception:
+            await deduplicator.release(fingerprint, contact_obj.id)
+            raise
+        response_cache.invalidate("contact")
         
-        logger.info(f"New contact message received from {contact_obj.email}")
+        logger.info(f"New contact message {contact_obj.id} received from {contact_obj.email}")
         
-        # Send email notification (async, don't wait for it to complete)
+        # Queue email notification, the outbox workers deliver it in the background
         try:
-            await send_email_notification(contact_obj)
+            await queue_contact_notification(contact_obj)
         except Exception as email_error:
-            logger.error(f"Email notification failed but message was saved: {str(email_error)}")
+            logger.error(f"Email notification could not be queued yet, the outbox sweeper retries it: {str(email_error)}")
         
         return {
             "success": True,
             "message": "Vaša správa bola úspešne odoslaná. Ozveme sa vám čoskoro!",
             "id": contact_obj.id
         }
+    except HTTPException:
+        raise
     except ValueError as e:
         logger.error(f"Validation error: {str(e)}")
         raise HTTPException(status_code=400, detail={
@@ -236,18 +559,215 @@ async def create_contact_message(input: ContactMessageCreate):
             "message": "Chyba servera. Skúste to prosím znova."
         })
 
+def build_contact_filter(
+    status: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    email: Optional[str] = None,
+) -> dict:
+    """Build the MongoDB filter shared by the contact message read endpoints"""
+    query = {}
+    if status:
+        query['status'] = status
+    if email:
+        query['email'] = email
+    if created_from or created_to:
+        query['created_at'] = {}
+        if created_from:
+            query['created_at']['$gte'] = to_db_time(created_from)
+        if created_to:
+            query['created_at']['$lt'] = to_db_time(created_to)
+    return query
+
+@api_router.post("/contact/bulk")
+async def create_contact_messages_bulk(input: ContactBulkCreate):
+    valid, errors = validate_contact_batch(input.messages)
+    
+    contacts = [(index, ContactMessage(**item.model_dump())) for index, item in valid]
+    # Ref of the batch's digest email, the outbox sweeper checks it before notifying messages one by one
+    digest_ref = str(uuid.uuid4())
+    docs = []
+    for _, contact_obj in contacts:
+        doc = contact_obj.model_dump()
+        doc['created_at'] = to_db_time(doc['created_at'])
+        doc['notification_pending'] = True
+        doc['digest_ref'] = digest_ref
+        docs.append(doc)
+    
+    # Unordered insert keeps going past individual write errors
+    failed_positions = set()
+    if docs:
+        try:
+            await db.contact_messages.insert_many(docs, ordered=False, **request_comment())
+        except BulkWriteError as e:
+            for write_error in e.details.get("writeErrors", []):
+                position = write_error["index"]
+                failed_positions.add(position)
+                errors.append({"index": contacts[position][0], "errors": [{"field": "", "message": write_error["errmsg"]}]})
+        except Exception as e:
+            logger.error(f"Error importing contact messages: {str(e)}")
+            raise HTTPException(status_code=500, detail={
+                "success": False,
+                "message": "Chyba servera. Skúste to prosím znova."
+            })
+    
+    inserted = [(index, c) for position, (index, c) in enumerate(contacts) if position not in failed_positions]
+    if inserted:
+        response_cache.invalidate("contact")
+    logger.info(f"Bulk import stored {len(inserted)} contact messages, rejected {len(errors)}")
+    
+    # One digest email for the whole batch instead of one per message
+    if inserted:
+        try:
+            await outbox.enqueue(build_digest_notification([c for _, c in inserted]), kind="contact_digest", ref=digest_ref)
+            await db.contact_messages.update_many(
+                {"id": {"$in": [c.id for _, c in inserted]}}, {"$unset": {"notification_pending": ""}},
+                **request_comment()
+            )
+        except Exception as email_error:
+            # Left pending. The outbox sweeper only clears the flags when the digest was queued,
+            # otherwise it queues one notification per message instead.
+            logger.error(f"Digest notification could not be queued yet, the outbox sweeper retries it: {str(email_error)}")
+    
+    return {
+        "success": not errors,
+        "inserted": len(inserted),
+        "failed": len(errors),
+        "items": [{"index": index, "id": c.id} for index, c in inserted],
+        "errors": sorted(errors, key=lambda err: err["index"]),
+    }
+
+async def apply_status_transition(query: dict, status: str, many: bool = False):
+    """Move the messages matching query to status, returns the (matched, modified) counts"""
+    now = to_db_time(datetime.now(timezone.utc))
+    changes = {"status": status, "status_changed_at": now}
+    write = db.contact_messages.update_many if many else db.contact_messages.update_one
+    matched = modified = 0
+    if status == "responded":
+        # Only the first response sets responded_at, the analytics measure response times from it.
+        # Each write filters on the prior state, so a message is moved by at most one of them.
+        result = await write({**query, "responded_at": None},
+                             {"$set": {**changes, "responded_at": now}, "$inc": {"version": 1}}, **request_comment())
+        matched, modified = result.matched_count, result.modified_count
+        if modified and not many:
+            return matched, modified
+    result = await write(query, {"$set": changes, "$inc": {"version": 1}}, **request_comment())
+    return matched + result.matched_count, modified + result.modified_count
+
+@api_router.patch("/contact/{message_id}/status")
+async def update_contact_status(message_id: str, input: ContactStatusUpdate):
+    query = {"id": message_id, "status": {"$in": STATUS_TRANSITIONS_FROM[input.status]}}
+    if input.expected_version is not None:
+        # Rows written before versioning have no version field yet
+        query["version"] = input.expected_version if input.expected_version else {"$in": [0, None]}
+    
+    try:
+        _, modified = await apply_status_transition(query, input.status)
+        if modified:
+            response_cache.invalidate("contact")
+            return {"success": True, "id": message_id, "status": input.status}
+        
+        current = await db.contact_messages.find_one(
+            {"id": message_id}, {"_id": 0, "status": 1, "version": 1}, **request_comment()
+        )
+    except Exception as e:
+        logger.error(f"Error updating contact message status: {str(e)}")
+        raise HTTPException(status_code=500, detail={
+            "success": False,
+            "message": "Chyba servera. Skúste to prosím znova."
+        })
+    if current is None:
+        raise HTTPException(status_code=404, detail={
+            "success": False,
+            "message": "Správa neexistuje"
+        })
+    raise HTTPException(status_code=409, detail={
+        "success": False,
+        "message": "Správa bola medzitým zmenená alebo prechod stavu nie je povolený",
+        "status": current.get("status"),
+        "version": current.get("version", 0),
+    })
+
+@api_router.post("/contact/status/bulk")
+async def update_contact_status_bulk(input: ContactStatusBulkUpdate):
+    allowed_from = STATUS_TRANSITIONS_FROM[input.status]
+    if input.from_status is not None and input.from_status not in allowed_from:
+        raise HTTPException(status_code=400, detail={
+            "success": False,
+            "message": f"Prechod zo stavu '{input.from_status}' na '{input.status}' nie je povolený"
+        })
+    # A request with only the target status would move every message
+    filtered = (input.ids is not None or input.created_from or input.created_to or input.email
+                or input.from_status is not None)
+    if not filtered and not input.all:
+        raise HTTPException(status_code=400, detail={
+            "success": False,
+            "message": "Zadajte ids, created_from/created_to, email alebo from_status, prípadne all: true pre všetky správy"
+        })
+    
+    # The prior state is part of the filter, so each update_many is atomic per document
+    query = build_contact_filter(None, input.created_from, input.created_to, input.email)
+    query['status'] = input.from_status or {"$in": allowed_from}
+    if input.ids is not None:
+        query['id'] = {"$in": input.ids}
+    
+    try:
+        matched, modified = await apply_status_transition(query, input.status, many=True)
+        if modified:
+            response_cache.invalidate("contact")
+    except Exception as e:
+        logger.error(f"Error updating contact message status: {str(e)}")
+        raise HTTPException(status_code=500, detail={
+            "success": False,
+            "message": "Chyba servera. Skúste to prosím znova."
+        })
+    
+    return {
+        "success": True,
+        "matched": matched,
+        "modified": modified,
+        "status": input.status,
+    }
+
 @api_router.get("/contact", response_model=List[ContactMessage])
-async def get_contact_messages():
+async def get_contact_messages(
+    request: Request,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    email: Optional[str] = None,
+):
+    key = response_cache.key("contact", request)
+    cached = response_cache.get(key)
+    if cached is not None:
+        return cached_json_response(cached, request, response_compressor)
+    
     try:
-        # Exclude MongoDB's _id field from the query results
-        messages = await db.contact_messages.find({}, {"_id": 0}).sort("created_at", -1).to_list(1000)
+        query = build_contact_filter(status, created_from, created_to, email)
+        if cursor:
+            query = merge_filters(query, keyset_filter('created_at', *decode_cursor(cursor)))
+        
+        # Keyset pagination on (created_at, id), newest first
+        messages = await read_db.contact_messages.find(query, contact_list_serializer.projection(), **request_comment()).sort(
+            [("created_at", -1), ("id", -1)]
+        ).limit(limit).to_list(limit)
         
-        # Convert ISO string timestamps back to datetime objects
-        for msg in messages:
-            if isinstance(msg['created_at'], str):
-                msg['created_at'] = datetime.fromisoformat(msg['created_at'])
+        # Only a full page can have a next page
+        headers = {}
+        if len(messages) == limit:
+            last = messages[-1]
+            headers['X-Next-Cursor'] = encode_cursor(last['created_at'], last['id'])
         
-        return messages
+        body = contact_list_serializer.dump(messages)
+        cached = response_cache.put(key, body, headers)
+        return cached_json_response(cached, request, response_compressor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail={
+            "success": False,
+            "message": str(e)
+        })
     except Exception as e:
         logger.error(f"Error fetching contact messages: {str(e)}")
         raise HTTPException(status_code=500, detail={
@@ -255,24 +775,234 @@ async def get_contact_messages():
             "message": "Chyba pri načítaní správ"
         })
 
+@api_router.get("/contact/search", response_model=List[ContactSearchResult])
+async def search_contact_messages(
+    response: Response,
+    q: str = Query(..., min_length=2, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=10000),
+    status: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+):
+    # Served by the contact_text index, ranked by relevance then newest first
+    query = build_contact_filter(status, created_from, created_to)
+    query['$text'] = {"$search": q}
+    score = {"score": {"$meta": "textScore"}}
+    try:
+        results = await read_db.contact_messages.find(query, {"_id": 0, **score}, **request_comment()).sort(
+            [("score", {"$meta": "textScore"}), ("created_at", -1)]
+        ).skip(offset).limit(limit).to_list(limit)
+    except Exception as e:
+        logger.error(f"Error searching contact messages: {str(e)}")
+        raise HTTPException(status_code=500, detail={
+            "success": False,
+            "message": "Chyba pri vyhľadávaní správ"
+        })
+    
+    if len(results) == limit:
+        response.headers['X-Next-Offset'] = str(offset + limit)
+    return results
+
+@api_router.get("/contact/export")
+async def export_contact_messages(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    batch_size: int = Query(500, ge=1, le=10000),
+    status: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    email: Optional[str] = None,
+):
+    # Rows are streamed from the cursor batch by batch, nothing is buffered in full
+    query = build_contact_filter(status, created_from, created_to, email)
+    cursor = read_db.contact_messages.find(query, export_projection(CONTACT_EXPORT_FIELDS), **request_comment()).sort(
+        [("created_at", -1), ("id", -1)]
+    ).batch_size(batch_size)
+    
+    filename = f"contact_messages_{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}"
+    if format == "csv":
+        body = stream_csv(cursor, CONTACT_EXPORT_FIELDS, batch_size)
+        media_type = "text/csv; charset=utf-8"
+        filename += ".csv"
+    else:
+        body = stream_ndjson(cursor, batch_size)
+        media_type = "application/x-ndjson"
+        filename += ".ndjson"
+    
+    return StreamingResponse(body, media_type=media_type, headers={
+        "Content-Disposition": f'attachment; filename="{filename}"'
+    })
+
+@api_router.get("/contact/stream")
+async def stream_contact_messages(request: Request, last_event_id: Optional[str] = None):
+    # Server-sent events, EventSource sends the id of the last event it saw when it reconnects
+    if feed.full:
+        raise HTTPException(
+            status_code=503,
+            detail={"success": False, "message": "Príliš veľa pripojení. Skúste to prosím neskôr."},
+            headers={"Retry-After": "5"},
+        )
+    last_event_id = request.headers.get("last-event-id") or last_event_id
+    return StreamingResponse(feed.events(last_event_id), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
+
+AnalyticsUnit = Literal["hour", "day", "week", "month"]
+
+async def read_analytics(source: str, unit: str, since: Optional[datetime], until: Optional[datetime]):
+    try:
+        if since is None and until is None:
+            series = await analytics.get_series(source, unit)
+            if series is not None and 'buckets' in series:
+                return series
+            return {"source": source, "unit": unit, "buckets": [], "total": 0, "refreshed_at": None}
+        buckets = await analytics.get_range(source, unit, since, until)
+        return {
+            "source": source,
+            "unit": unit,
+            "buckets": buckets,
+            "total": sum(b["total"] for b in buckets),
+            "refreshed_at": max((b["refreshed_at"] for b in buckets), default=None),
+        }
+    except Exception as e:
+        logger.error(f"Error reading {source} analytics: {str(e)}")
+        raise HTTPException(status_code=500, detail={
+            "success": False,
+            "message": "Chyba pri načítaní štatistík"
+        })
+
+@api_router.get("/analytics/contact")
+async def get_contact_analytics(
+    unit: AnalyticsUnit = "day",
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+):
+    """Contact messages per bucket of created_at, by status, with first response time statistics"""
+    return await read_analytics("contact", unit, since, until)
+
+@api_router.get("/analytics/status")
+async def get_status_analytics(
+    unit: AnalyticsUnit = "day",
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+):
+    """Status checks per bucket of timestamp, with the number of distinct clients"""
+    return await read_analytics("status", unit, since, until)
+
+@api_router.post("/analytics/refresh")
+async def refresh_analytics(full: bool = False):
+    try:
+        results = await analytics.refresh(full=full)
+    except Exception as e:
+        logger.error(f"Analytics refresh failed: {str(e)}")
+        raise HTTPException(status_code=500, detail={
+            "success": False,
+            "message": "Chyba pri prepočte štatistík"
+        })
+    return {"success": True, "series": results, "units": list(SERIES_LENGTH)}
+
+@api_router.get("/health")
+async def liveness():
+    return {"status": "ok"}
+
+@api_router.get("/health/ready")
+async def readiness(response: Response):
+    if not getattr(app.state, 'db_ready', False):
+        # The startup warm-up failed, the pool is warmed before the worker takes traffic
+        await warm_up_database()
+        if not app.state.db_ready:
+            response.status_code = 503
+            return {"status": "unavailable", "mongo": "warm-up failed"}
+    try:
+        latency_ms = await database.ping(client)
+    except Exception as e:
+        logger.error(f"Readiness check failed: {str(e)}")
+        response.status_code = 503
+        return {"status": "unavailable", "mongo": "unreachable"}
+    return {"status": "ready", "mongo_ping_ms": latency_ms}
+
+@api_router.get("/admin/cache")
+async def get_cache_stats():
+    return response_cache.stats()
+
+@api_router.get("/admin/retention")
+async def get_retention_state():
+    return {"last_run": await retention.last_run()}
+
+@api_router.post("/admin/retention/run")
+async def run_retention():
+    try:
+        summary = await retention.run()
+    except Exception as e:
+        logger.error(f"Retention run failed: {str(e)}")
+        raise HTTPException(status_code=500, detail={
+            "success": False,
+            "message": "Chyba pri archivácii správ"
+        })
+    if summary is None:
+        raise HTTPException(status_code=409, detail={
+            "success": False,
+            "message": "Archivácia už prebieha"
+        })
+    response_cache.invalidate("contact")
+    return {"success": True, **summary}
+
+@api_router.get("/admin/indexes")
+async def get_index_report():
+    try:
+        return await index_report(db)
+    except Exception as e:
+        logger.error(f"Error reading index statistics: {str(e)}")
+        raise HTTPException(status_code=500, detail={
+            "success": False,
+            "message": "Chyba pri načítaní štatistík indexov"
+        })
+
 # Include the router in the main app
 app.include_router(api_router)
 
+# Prometheus scrape endpoint, outside /api so it is not exposed through the public ingress path
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+# Inside admission control, a key that is not cached in memory costs database round trips
+app.add_middleware(
+    IdempotencyMiddleware,
+    store=idempotency_store,
+    paths=RATE_LIMITS.keys(),
+    on_replay=lambda route: metrics.idempotent_replays_total.inc(route=route),
+)
+
+app.add_middleware(
+    AdmissionControlMiddleware,
+    limiter=rate_limiter,
+    concurrency=post_concurrency,
+    routes=RATE_LIMITS,
+    trusted_proxy_hops=TRUSTED_PROXY_HOPS,
+    on_reject=lambda route, reason: metrics.rate_limited_total.inc(route=route, reason=reason),
+)
+
+# Replays of recent retries from memory are served ahead of admission control and never rate limited
+app.add_middleware(
+    IdempotencyMiddleware,
+    store=idempotency_store,
+    paths=RATE_LIMITS.keys(),
+    on_replay=lambda route: metrics.idempotent_replays_total.inc(route=route),
+    local_only=True,
+)
+
+app.add_middleware(metrics.MetricsMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Next-Offset", "ETag", "X-Request-ID", REPLAYED_HEADER],
 )
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger(__name__)
-
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+# Outermost, every log line of a request carries its id
+app.add_middleware(RequestContextMiddleware, slow_seconds=LOG_SLOW_REQUEST_SECONDS)
@@ -6,11 +6,12 @@ Tests the POST /api/contact and GET /api/contact endpoints
 
 import requests
 import json
+import os
 import sys
 from datetime import datetime
 
-# Backend URL from frontend/.env
-BACKEND_URL = "https://eu-delivery.preview.emergentagent.com/api"
+# Backend URL from frontend/.env, override with BACKEND_URL to test a local server
+BACKEND_URL = os.environ.get("BACKEND_URL", "https://eu-delivery.preview.emergentagent.com/api")
 
 def test_contact_api():
     """Test the contact form API endpoints"""
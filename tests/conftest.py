@@ -0,0 +1,42 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+# After the backend, benchmarks/serialization.py must not shadow the backend module
+sys.path.append(str(BACKEND_DIR / "benchmarks"))
+
+# Background jobs are driven by the tests themselves
+os.environ.setdefault("OUTBOX_SWEEP_INTERVAL", "0")
+os.environ.setdefault("LOG_FORMAT", "text")
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def server():
+    """The server module, configured for mongomock and the fake email sender before its first import"""
+    from load_test import prepare_in_process
+
+    prepare_in_process("mongomock")
+    import server
+
+    return server
+
+
+@pytest.fixture
+async def api(server):
+    """The app served in-process against mongomock with the fake email sender, as in load_test.py"""
+    import httpx
+
+    app = server.app
+    async with app.router.lifespan_context(app):
+        await server.client.drop_database(server.db.name)
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            yield client
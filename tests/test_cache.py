@@ -0,0 +1,26 @@
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_contact_list_is_revalidated_and_invalidated_by_writes(api):
+    params = {"email": "cache@example.com"}
+    first = await api.get("/api/contact", params=params)
+    assert first.status_code == 200
+    assert first.json() == []
+    etag = first.headers["ETag"]
+
+    unchanged = await api.get("/api/contact", params=params, headers={"If-None-Match": etag})
+    assert unchanged.status_code == 304
+    assert unchanged.headers["ETag"] == etag
+    assert unchanged.content == b""
+
+    response = await api.post("/api/contact", json={
+        "name": "Ján Novák", "email": "cache@example.com", "message": "Nová správa po uložení do cache.",
+    })
+    message_id = response.json()["id"]
+
+    changed = await api.get("/api/contact", params=params, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert [row["id"] for row in changed.json()] == [message_id]
@@ -0,0 +1,35 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+def test_recent_entries_expire_and_stay_bounded():
+    from claims import RecentEntries
+
+    recent = RecentEntries(max_entries=2)
+    recent.put("a", 1, ttl=60)
+    recent.put("expired", 2, ttl=-1)
+    assert recent.get("expired") is None
+    recent.put("b", 3, ttl=60)
+    recent.put("c", 4, ttl=60)
+    assert len(recent) == 2
+    assert recent.get("a") is None
+    assert (recent.get("b"), recent.get("c")) == (3, 4)
+
+
+async def test_expired_claims_are_taken_over(api):
+    import server
+    from claims import claim_key
+
+    collection = server.db.claims
+    now = datetime.now(timezone.utc)
+    assert await claim_key(collection, "k", {"owner": "first"}, now, now + timedelta(seconds=60)) is None
+    held = await claim_key(collection, "k", {"owner": "second"}, now, now + timedelta(seconds=60))
+    assert held["owner"] == "first"
+
+    # Not yet removed by the TTL monitor, but past its expiry
+    later = now + timedelta(seconds=61)
+    assert await claim_key(collection, "k", {"owner": "third"}, later, later + timedelta(seconds=60)) is None
+    assert (await collection.find_one({"_id": "k"}))["owner"] == "third"
@@ -0,0 +1,109 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+def contact(message: str) -> dict:
+    return {"name": "Ján Novák", "email": "jan@example.com", "phone": "+421901234567", "message": message}
+
+
+async def test_notification_lost_before_the_outbox_is_recovered(api, monkeypatch):
+    import server
+
+    async def unavailable(*args, **kwargs):
+        raise RuntimeError("outbox unavailable")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(server.outbox, "enqueue", unavailable)
+        response = await api.post("/api/contact", json=contact("Správa, ktorej email sa nezaradil."))
+    assert response.status_code == 200
+    message_id = response.json()["id"]
+    assert (await server.db.contact_messages.find_one({"id": message_id}))["notification_pending"] is True
+
+    # Requests still queueing their own notification are left alone
+    assert await server.outbox.sweep() == 0
+    await server.db.contact_messages.update_one(
+        {"id": message_id}, {"$set": {"created_at": datetime.now(timezone.utc) - timedelta(minutes=5)}}
+    )
+    assert await server.outbox.sweep() == 1
+    assert await server.outbox.sweep() == 0
+
+    assert "notification_pending" not in await server.db.contact_messages.find_one({"id": message_id})
+    assert await server.db.email_outbox.count_documents({"ref": message_id}) == 1
+
+
+async def test_bulk_reports_non_object_items_per_index(api):
+    response = await api.post("/api/contact/bulk", json={"messages": [
+        "notadict",
+        contact("Hromadný import, platný riadok."),
+        None,
+    ]})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["inserted"] == 1
+    assert [item["index"] for item in body["items"]] == [1]
+    assert [error["index"] for error in body["errors"]] == [0, 2]
+
+
+async def test_responded_message_can_be_reopened(api):
+    message_id = (await api.post("/api/contact", json=contact("Správa označená omylom."))).json()["id"]
+
+    for status in ("responded", "new", "read", "responded"):
+        response = await api.patch(f"/api/contact/{message_id}/status", json={"status": status})
+        assert response.status_code == 200, status
+    response = await api.patch(f"/api/contact/{message_id}/status", json={"status": "responded"})
+    assert response.status_code == 409
+
+
+async def test_responded_at_keeps_the_first_response(api):
+    import server
+
+    message_id = (await api.post("/api/contact", json=contact("Správa zodpovedaná dvakrát."))).json()["id"]
+    await api.patch(f"/api/contact/{message_id}/status", json={"status": "responded"})
+    first = (await server.db.contact_messages.find_one({"id": message_id}))["responded_at"]
+    assert first is not None
+
+    await api.patch(f"/api/contact/{message_id}/status", json={"status": "new"})
+    response = await api.post("/api/contact/status/bulk", json={"status": "responded", "ids": [message_id]})
+    assert response.json()["modified"] == 1
+    doc = await server.db.contact_messages.find_one({"id": message_id})
+    assert doc["status"] == "responded"
+    assert doc["responded_at"] == first
+    assert doc["version"] == 3
+
+
+async def test_bulk_status_update_needs_a_filter(api):
+    await api.post("/api/contact", json=contact("Správa pre hromadnú zmenu stavu."))
+
+    response = await api.post("/api/contact/status/bulk", json={"status": "read"})
+    assert response.status_code == 400
+    response = await api.post("/api/contact/status/bulk", json={"status": "read", "all": True})
+    assert response.status_code == 200
+    assert response.json()["modified"] >= 1
+
+
+async def test_messages_covered_by_a_queued_digest_are_not_notified_again(api):
+    import server
+
+    response = await api.post("/api/contact/bulk", json={"messages": [
+        contact("Hromadný import, prvá správa s digestom."),
+        contact("Hromadný import, druhá správa s digestom."),
+    ]})
+    ids = [item["id"] for item in response.json()["items"]]
+    digest_ref = (await server.db.contact_messages.find_one({"id": ids[0]}))["digest_ref"]
+    assert await server.db.email_outbox.count_documents({"kind": "contact_digest", "ref": digest_ref}) == 1
+
+    # As if clearing the flags failed after the digest was queued
+    aged = {"notification_pending": True, "created_at": datetime.now(timezone.utc) - timedelta(minutes=5)}
+    await server.db.contact_messages.update_many({"id": {"$in": ids}}, {"$set": aged})
+    assert await server.outbox.sweep() == 0
+    assert await server.db.contact_messages.count_documents({"id": {"$in": ids}, "notification_pending": True}) == 0
+    assert await server.db.email_outbox.count_documents({"ref": {"$in": ids}}) == 0
+
+    # Without the digest in the outbox every message is notified on its own
+    await server.db.email_outbox.delete_many({"ref": digest_ref})
+    await server.db.contact_messages.update_many({"id": {"$in": ids}}, {"$set": aged})
+    assert await server.outbox.sweep() == 2
+    assert await server.db.email_outbox.count_documents({"ref": {"$in": ids}}) == 2
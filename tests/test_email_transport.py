@@ -0,0 +1,74 @@
+import pytest
+
+import email_transport
+from email_transport import CircuitBreaker, CircuitOpenError, DeliveryError, FakeTransport, ReliableTransport
+
+pytestmark = pytest.mark.anyio
+
+PARAMS = {"from": "web@fenji.sk", "to": ["info@fenji.sk"], "subject": "Test", "html": "<p>Test</p>"}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(email_transport.time, "monotonic", clock)
+    return clock
+
+
+async def test_breaker_opens_half_opens_and_closes(clock):
+    fake = FakeTransport(fail_times=3)
+    transport = ReliableTransport(fake, breaker=CircuitBreaker(failure_threshold=3, reset_timeout=60))
+
+    for _ in range(3):
+        with pytest.raises(DeliveryError):
+            await transport.send(PARAMS)
+    assert transport.breaker.state == "open"
+
+    # Open: calls fail fast without reaching the provider
+    with pytest.raises(CircuitOpenError) as error:
+        await transport.send(PARAMS)
+    assert error.value.retry_after == 60
+    assert fake.sent == []
+
+    clock.now += 60
+    assert transport.breaker.state == "half_open"
+    assert await transport.send(PARAMS) == "fake-1"
+    assert transport.breaker.state == "closed"
+    assert transport.breaker.failures == 0
+
+
+async def test_failed_trial_reopens_the_breaker(clock):
+    fake = FakeTransport(fail_times=2)
+    transport = ReliableTransport(fake, breaker=CircuitBreaker(failure_threshold=1, reset_timeout=30))
+
+    with pytest.raises(DeliveryError):
+        await transport.send(PARAMS)
+    clock.now += 30
+    assert transport.breaker.state == "half_open"
+    with pytest.raises(DeliveryError):
+        await transport.send(PARAMS)
+    # The cool-down starts over from the failed trial
+    assert transport.breaker.state == "open"
+    clock.now += 29
+    with pytest.raises(CircuitOpenError):
+        await transport.send(PARAMS)
+
+
+def test_only_one_trial_call_while_half_open(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+    breaker.record_failure()
+    clock.now += 10
+
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success()
+    breaker.before_call()
@@ -0,0 +1,22 @@
+import csv
+import io
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_csv_export_does_not_emit_formulas(api):
+    message = '=HYPERLINK("http://evil.example","Kliknite sem")'
+    response = await api.post("/api/contact", json={
+        "name": "Ján Novák", "email": "formula@example.com", "phone": "+421901234567", "message": message,
+    })
+    assert response.status_code == 200
+
+    export = await api.get("/api/contact/export", params={"format": "csv", "email": "formula@example.com"})
+    assert export.status_code == 200
+    rows = list(csv.DictReader(io.StringIO(export.content.decode("utf-8-sig"))))
+    assert len(rows) == 1
+    assert rows[0]["message"] == "'" + message
+    assert rows[0]["phone"] == "'+421901234567"
+    assert rows[0]["name"] == "Ján Novák"
@@ -0,0 +1,63 @@
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+def contact(message: str) -> dict:
+    return {"name": "Eva Kováčová", "email": "eva@example.com", "message": message}
+
+
+async def test_retry_with_the_same_key_is_replayed(api):
+    import server
+
+    headers = {"Idempotency-Key": "replay-1"}
+    first = await api.post("/api/contact", json=contact("Prvý pokus o odoslanie."), headers=headers)
+    retry = await api.post("/api/contact", json=contact("Prvý pokus o odoslanie."), headers=headers)
+    assert first.status_code == retry.status_code == 200
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.json() == first.json()
+    assert await server.db.contact_messages.count_documents({"id": first.json()["id"]}) == 1
+
+    reused = await api.post("/api/contact", json=contact("Iný text s rovnakým kľúčom."), headers=headers)
+    assert reused.status_code == 422
+
+
+async def test_key_is_released_after_a_server_error(api, monkeypatch):
+    import server
+
+    async def unavailable(*args, **kwargs):
+        raise RuntimeError("database unavailable")
+
+    headers = {"Idempotency-Key": "released-1"}
+    with monkeypatch.context() as patch:
+        patch.setattr(server.deduplicator, "claim", unavailable)
+        failed = await api.post("/api/contact", json=contact("Pokus, ktorý zlyhá."), headers=headers)
+    assert failed.status_code == 500
+
+    retry = await api.post("/api/contact", json=contact("Pokus, ktorý zlyhá."), headers=headers)
+    assert retry.status_code == 200
+    assert "Idempotent-Replayed" not in retry.headers
+
+
+async def test_only_cached_replays_skip_admission_control(api, monkeypatch):
+    import server
+    from ratelimit import MemoryBucketStore, Rate
+
+    monkeypatch.setattr(server.rate_limiter, "enabled", True)
+    monkeypatch.setattr(server.rate_limiter, "store", MemoryBucketStore())
+    monkeypatch.setitem(server.RATE_LIMITS, "/api/contact", Rate(1, 1 / 60))
+
+    headers = {"Idempotency-Key": "admission-1"}
+    first = await api.post("/api/contact", json=contact("Správa pred limitom."), headers=headers)
+    assert first.status_code == 200
+    replay = await api.post("/api/contact", json=contact("Správa pred limitom."), headers=headers)
+    assert replay.status_code == 200
+    assert replay.headers["Idempotent-Replayed"] == "true"
+
+    # Looking the key up in the database is admitted like any other request
+    from claims import RecentEntries
+
+    monkeypatch.setattr(server.idempotency_store, "_recent", RecentEntries())
+    limited = await api.post("/api/contact", json=contact("Správa pred limitom."), headers=headers)
+    assert limited.status_code == 429
+    assert "Retry-After" in limited.headers
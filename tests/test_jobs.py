@@ -0,0 +1,51 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_lease_is_held_until_released_or_expired(api):
+    import server
+    from jobs import acquire_lease, release_lease
+
+    leases = server.db.job_leases
+    now = datetime.now(timezone.utc)
+    assert await acquire_lease(leases, "refresh", now, 60) == {}
+    assert await acquire_lease(leases, "refresh", now, 60) is None
+    # Another key is leased independently
+    assert await acquire_lease(leases, "other", now, 60) == {}
+
+    await release_lease(leases, "refresh")
+    assert await acquire_lease(leases, "refresh", now, 60) is not None
+    assert await acquire_lease(leases, "refresh", now + timedelta(seconds=61), 60) is not None
+
+
+async def test_retention_run_is_skipped_while_another_worker_holds_it(api):
+    import server
+    from jobs import acquire_lease
+
+    await acquire_lease(server.db.retention_runs, "retention", datetime.now(timezone.utc), 60)
+    assert await server.retention.run() is None
+
+
+async def test_periodic_job_keeps_running_after_a_failed_tick():
+    from jobs import PeriodicJob
+
+    class Flaky(PeriodicJob):
+        ticks = 0
+
+        async def tick(self):
+            self.ticks += 1
+            if self.ticks == 1:
+                raise RuntimeError("first tick fails")
+
+    job = Flaky(interval=0.001)
+    job.start()
+    for _ in range(100):
+        if job.ticks >= 2:
+            break
+        await asyncio.sleep(0.001)
+    await job.stop()
+    assert job.ticks >= 2
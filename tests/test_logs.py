@@ -0,0 +1,12 @@
+def test_handler_queries_are_tagged_with_the_request_id(server, monkeypatch):
+    from logs import request_context
+
+    monkeypatch.setattr(server, "MONGO_REQUEST_COMMENTS", True)
+    with request_context("3f2a9c"):
+        assert server.request_comment() == {"comment": "3f2a9c"}
+    # Background work outside a request sends no comment
+    assert server.request_comment() == {}
+
+    monkeypatch.setattr(server, "MONGO_REQUEST_COMMENTS", False)
+    with request_context("3f2a9c"):
+        assert server.request_comment() == {}
@@ -0,0 +1,24 @@
+from datetime import datetime
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_finished_migration_converts_rows_written_since(api):
+    import server
+    from migrations import migrate_timestamps
+
+    messages = server.db.contact_messages
+    await messages.insert_one({"id": "m1", "created_at": "2025-10-25T18:30:00+00:00",
+                               "status_changed_at": "2025-10-26T08:00:00+00:00", "responded_at": None})
+    results = await migrate_timestamps(server.db)
+    assert results["contact_messages.created_at"] == 1
+    assert results["contact_messages.status_changed_at"] == 1
+    assert results["contact_messages.responded_at"] == 0
+
+    # e.g. a worker still running with TIMESTAMP_STORAGE=iso
+    await messages.insert_one({"id": "m2", "created_at": "2025-10-27T09:00:00+00:00"})
+    assert (await migrate_timestamps(server.db))["contact_messages.created_at"] == 1
+    async for doc in messages.find({"id": {"$in": ["m1", "m2"]}}):
+        assert isinstance(doc["created_at"], datetime)
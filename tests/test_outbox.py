@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from email_transport import FakeTransport, PermanentDeliveryError
+from outbox import FAILED, PENDING, SENT, EmailOutbox
+
+pytestmark = pytest.mark.anyio
+
+PARAMS = {"from": "web@fenji.sk", "to": ["info@fenji.sk"], "subject": "Nová správa", "html": "<p>Ahoj</p>"}
+
+
+def make_outbox(transport, **options):
+    collection = AsyncMongoMockClient(tz_aware=True)["test"]["email_outbox"]
+    return EmailOutbox(collection, transport, backoff_base=2.0, backoff_max=300.0, **options)
+
+
+async def test_delivers_and_expires_sent_records():
+    transport = FakeTransport()
+    outbox = make_outbox(transport)
+    record_id = await outbox.enqueue(PARAMS, ref="m1")
+
+    assert await outbox.drain() == 1
+    record = await outbox.collection.find_one({"id": record_id})
+    assert record["status"] == SENT
+    assert record["provider_id"] == "fake-1"
+    assert record["expires_at"] > record["sent_at"]
+    assert transport.sent == [PARAMS]
+
+
+async def test_failed_attempt_is_retried_with_backoff():
+    outbox = make_outbox(FakeTransport(fail_times=2))
+    record_id = await outbox.enqueue(PARAMS)
+
+    await outbox.drain()
+    record = await outbox.collection.find_one({"id": record_id})
+    assert record["status"] == PENDING
+    assert record["attempts"] == 1
+    assert "simulated" in record["last_error"]
+    # Not due again before its backoff has passed
+    assert await outbox.claim() is None
+    assert [outbox.backoff(n) for n in (1, 2, 3, 10)] == [2.0, 4.0, 8.0, 300.0]
+
+    for expected_attempts in (2, 3):
+        await outbox.collection.update_one({"id": record_id}, {"$set": {"next_attempt_at": record["created_at"]}})
+        await outbox.drain()
+        record = await outbox.collection.find_one({"id": record_id})
+        assert record["attempts"] == expected_attempts
+    assert record["status"] == SENT
+
+
+async def test_gives_up_after_max_attempts():
+    outbox = make_outbox(FakeTransport(fail_times=10), max_attempts=2)
+    record_id = await outbox.enqueue(PARAMS)
+
+    await outbox.drain()
+    record = await outbox.collection.find_one({"id": record_id})
+    await outbox.collection.update_one({"id": record_id}, {"$set": {"next_attempt_at": record["created_at"]}})
+    await outbox.drain()
+    record = await outbox.collection.find_one({"id": record_id})
+    assert record["status"] == FAILED
+    assert record["attempts"] == 2
+    assert "expires_at" in record
+
+
+async def test_permanent_failure_is_not_retried():
+    class Rejecting(FakeTransport):
+        async def send(self, params):
+            raise PermanentDeliveryError("invalid recipient")
+
+    outbox = make_outbox(Rejecting())
+    record_id = await outbox.enqueue(PARAMS)
+
+    await outbox.drain()
+    record = await outbox.collection.find_one({"id": record_id})
+    assert record["status"] == FAILED
+    assert record["attempts"] == 1
+
+
+async def test_worker_survives_database_errors():
+    transport = FakeTransport()
+    outbox = make_outbox(transport, workers=1, poll_interval=0.01, lease_seconds=0.05)
+    update_one = outbox.collection.update_one
+    failures = {"left": 2}
+
+    async def flaky_update_one(*args, **kwargs):
+        if failures["left"]:
+            failures["left"] -= 1
+            raise RuntimeError("connection reset")
+        return await update_one(*args, **kwargs)
+
+    outbox.collection.update_one = flaky_update_one
+    outbox.start()
+    try:
+        record_id = await outbox.enqueue(PARAMS)
+        for _ in range(200):
+            record = await outbox.collection.find_one({"id": record_id})
+            if record["status"] == SENT:
+                break
+            await asyncio.sleep(0.01)
+        assert record["status"] == SENT
+        assert not outbox._tasks[0].done()
+    finally:
+        await outbox.stop()
@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from pagination import InvalidCursor, decode_cursor, encode_cursor, keyset_filter
+
+pytestmark = pytest.mark.anyio
+
+
+def test_cursor_round_trip_keeps_datetimes():
+    created_at = datetime(2025, 10, 25, 18, 30, 0, 123000, tzinfo=timezone.utc)
+    assert decode_cursor(encode_cursor(created_at, "id-1")) == (created_at, "id-1")
+    assert decode_cursor(encode_cursor("2025-10-25T18:30:00+00:00", "id-2")) == ("2025-10-25T18:30:00+00:00", "id-2")
+
+
+@pytest.mark.parametrize("cursor", ["", "not base64!", encode_cursor("x", "id")[:-3] + "zz", "WzEsMl0"])
+def test_invalid_cursor_is_rejected(cursor):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor)
+
+
+def test_date_cursor_also_matches_legacy_string_rows():
+    created_at = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    assert {"created_at": {"$type": "string"}} in keyset_filter("created_at", created_at, "id")["$or"]
+    assert len(keyset_filter("created_at", "2025-01-01T00:00:00", "id")["$or"]) == 2
+
+
+async def test_pages_cover_every_message_once(api):
+    import server
+
+    now = datetime.now(timezone.utc)
+    rows = [
+        {"id": f"m{n:02}", "name": "Ján Novák", "email": "jan@example.com", "message": "Dobrý deň, otázka.",
+         "status": "new", "created_at": now - timedelta(minutes=n // 2)}
+        for n in range(11)
+    ]
+    # Not migrated yet, sorts after every date
+    rows += [{**rows[0], "id": "legacy", "created_at": (now - timedelta(days=30)).isoformat()}]
+    await server.db.contact_messages.insert_many(rows)
+
+    seen, cursor = [], None
+    while True:
+        response = await api.get("/api/contact", params={"limit": 4, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        seen += [message["id"] for message in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+
+    # Newest first, rows sharing a created_at ordered by id descending
+    expected = [row["id"] for row in sorted(rows[:11], key=lambda row: (row["created_at"], row["id"]), reverse=True)]
+    assert seen == expected + ["legacy"]
+
+
+async def test_malformed_cursor_returns_400(api):
+    response = await api.get("/api/contact", params={"cursor": "garbage"})
+    assert response.status_code == 400
+    assert response.json()["detail"]["success"] is False
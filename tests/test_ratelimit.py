@@ -0,0 +1,67 @@
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+def contact(email: str, message: str) -> dict:
+    return {"name": "Ján Novák", "email": email, "message": message}
+
+
+@pytest.fixture
+def limits(monkeypatch):
+    """Rate limiting switched on with empty buckets"""
+    import server
+    from ratelimit import MemoryBucketStore
+
+    monkeypatch.setattr(server.rate_limiter, "enabled", True)
+    monkeypatch.setattr(server.rate_limiter, "store", MemoryBucketStore())
+    return monkeypatch
+
+
+async def test_per_ip_limit_answers_429_with_retry_after(api, limits):
+    import server
+    from ratelimit import Rate
+
+    limits.setitem(server.RATE_LIMITS, "/api/contact", Rate(2, 2 / 60))
+    for n in range(2):
+        response = await api.post("/api/contact", json=contact(f"ip{n}@example.com", f"Správa číslo {n} z jednej IP."))
+        assert response.status_code == 200
+    response = await api.post("/api/contact", json=contact("ip2@example.com", "Správa nad limit IP adresy."))
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert response.json()["detail"]["success"] is False
+
+    # Another client has its own bucket
+    response = await api.post("/api/contact", json=contact("ip3@example.com", "Správa z inej IP adresy."),
+                              headers={"X-Forwarded-For": "203.0.113.7"})
+    assert response.status_code == 200
+
+
+async def test_per_email_limit_answers_429_with_retry_after(api, limits):
+    import server
+    from ratelimit import Rate
+
+    limits.setitem(server.RATE_LIMITS, "/api/contact", None)
+    limits.setattr(server, "RATE_LIMIT_CONTACT_EMAIL", Rate(1, 1 / 3600))
+    response = await api.post("/api/contact", json=contact("limit@example.com", "Prvá správa z adresy."))
+    assert response.status_code == 200
+    response = await api.post("/api/contact", json=contact("Limit@Example.com", "Druhá správa z adresy."))
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) > 60
+
+
+async def test_excess_concurrent_posts_are_shed(api, monkeypatch):
+    import server
+
+    monkeypatch.setattr(server.post_concurrency, "limit", 1)
+    monkeypatch.setattr(server.post_concurrency, "active", 1)
+    response = await api.post("/api/contact", json=contact("busy@example.com", "Správa počas preťaženia."))
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+    # Only POST requests are admission controlled
+    assert (await api.get("/api/contact")).status_code == 200
+
+    monkeypatch.setattr(server.post_concurrency, "active", 0)
+    response = await api.post("/api/contact", json=contact("busy@example.com", "Správa počas preťaženia."))
+    assert response.status_code == 200
+    assert server.post_concurrency.active == 0
@@ -0,0 +1,20 @@
+from datetime import datetime, timezone
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_unparseable_status_timestamps_do_not_stop_the_backfill(api):
+    import server
+
+    await server.db.status_checks.insert_many([
+        {"id": "s1", "client_name": "a", "timestamp": "not a date"},
+        {"id": "s2", "client_name": "b", "timestamp": "2025-10-25T18:30:00+00:00"},
+    ])
+    assert await server.retention.backfill_status_expiry() == 2
+
+    # Expired from now, the legacy row expired long ago and is already gone through the TTL index
+    unparseable = await server.db.status_checks.find_one({"id": "s1"})
+    assert unparseable["expires_at"].replace(tzinfo=timezone.utc) > datetime.now(timezone.utc)
+    assert await server.db.status_checks.find_one({"id": "s2"}) is None
@@ -0,0 +1,28 @@
+from datetime import datetime, timezone
+
+import pytest
+
+ROWS = [
+    {"id": "a", "name": "Ján Novák", "email": "jan@example.com", "phone": "+421901234567",
+     "message": "Dobrý deň, \"úvodzovky\" a emoji 🙂", "created_at": datetime(2025, 10, 25, 18, 30, tzinfo=timezone.utc),
+     "status": "responded", "status_changed_at": datetime(2025, 10, 26, 8, 0, 0, 123456, tzinfo=timezone.utc),
+     "responded_at": datetime(2025, 10, 26, 8, 0, 0, 123456, tzinfo=timezone.utc), "version": 2},
+    # Written before status tracking and versioning
+    {"id": "b", "name": "Eva", "email": "eva@example.com", "phone": None, "message": "Staršia správa bez verzie.",
+     "created_at": datetime(2024, 1, 2, 3, 4, 5), "status": "new"},
+]
+
+
+@pytest.mark.parametrize("rows", [
+    ROWS,
+    [{**ROWS[1], "created_at": "2024-01-02T03:04:05+00:00"}],
+], ids=["datetimes", "iso-strings"])
+def test_fast_and_validated_modes_produce_the_same_json(server, rows):
+    from serialization import RowSerializer
+
+    fast = RowSerializer(server.ContactMessage, "fast")
+    validated = RowSerializer(server.ContactMessage, "validated")
+    assert fast.fast
+    assert fast.dump(rows) == validated.dump(rows)
+    for row in rows:
+        assert fast.dump_row(row) == validated.dump_row(row)